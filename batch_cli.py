@@ -0,0 +1,275 @@
+# batch_cli.py
+"""
+Headless batch runner (no Streamlit).
+
+Analyze every CDR in a directory / glob:
+    python batch_cli.py analyze "cdrs/*.xlsx" cdrs_2 --out analyzed --workers 4
+
+Extract applications (image / PDF -> Gemini -> Excel):
+    python batch_cli.py extract scans/ --out extracted_data.xlsx --concurrency 4
+
+A throughput summary (rows/sec, files/sec, failures, per-stage spans) is
+printed and written as JSON next to the output (or to --summary).
+With OTEL_EXPORTER_OTLP_ENDPOINT set the spans are also sent as a trace.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import shutil
+import sys
+import time
+from types import SimpleNamespace
+
+ANALYZE_EXTENSIONS = [".xlsx", ".csv"]
+EXTRACT_EXTENSIONS = [".jpg", ".jpeg", ".png", ".pdf"]
+
+
+def collect_files(inputs, extensions):
+    """
+    Expand directories and glob patterns into a sorted list of files with the given extensions.
+    """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in os.listdir(item)]
+        else:
+            candidates = glob.glob(item, recursive=True)
+        files.extend(
+            path for path in candidates
+            if os.path.isfile(path) and os.path.splitext(path)[1].lower() in extensions
+        )
+    return sorted(set(files))
+
+
+def output_stems(files):
+    """
+    Unique output name stem per input file: its name without extension, or, when
+    several inputs share that name (cdrs/x.xlsx, cdrs_2/x.xlsx, cdrs_2/x.csv), its
+    path relative to their common directory with the extension kept (cdrs-x-xlsx).
+    """
+    names = {path: os.path.splitext(os.path.basename(path))[0] for path in files}
+    shared = {name for name in names.values() if list(names.values()).count(name) > 1}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    stems = {}
+    used = set()
+    for path in files:
+        stem = names[path]
+        if stem in shared:
+            relative, ext = os.path.splitext(os.path.relpath(os.path.abspath(path), root))
+            stem = "-".join(relative.split(os.sep) + [ext.lstrip(".").lower()])
+        # Last resort for names that still clash (e.g. a-b/x.xlsx and a/b-x.xlsx)
+        unique, number = stem, 2
+        while unique.lower() in used:
+            unique, number = f"{stem} ({number})", number + 1
+        used.add(unique.lower())
+        stems[path] = unique
+    return stems
+
+
+def write_summary(summary, summary_path, perf=None):
+    if perf is not None:
+        summary["spans"] = perf.to_list()
+        perf.export_otel(summary["mode"])
+    elapsed = summary["seconds"] or 1e-9
+    summary["files_per_sec"] = round(summary["files"] / elapsed, 3)
+    summary["rows_per_sec"] = round(summary["rows"] / elapsed, 1)
+    summary["seconds"] = round(summary["seconds"], 2)
+
+    print(
+        f"\n{summary['mode']}: {summary['files']} file(s), {summary['rows']} row(s) in {summary['seconds']}s "
+        f"-> {summary['files_per_sec']} files/sec, {summary['rows_per_sec']} rows/sec, "
+        f"{len(summary['failures'])} failure(s)"
+    )
+    for failure in summary["failures"]:
+        print(f"  FAILED {failure['file']}: {failure['error']}")
+
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Summary written to {summary_path}")
+
+
+# -------------------- analyze --------------------
+def run_analyze(args):
+    from utils.parallel_analyzer import iter_analyses, partition_path
+    from utils.bulk_writer import BULK_FORMATS
+    from utils.case_store import CaseStore
+    from utils.session_cache import upload_key
+    from utils.perf import PerfRecorder
+
+    files = collect_files(args.inputs, ANALYZE_EXTENSIONS)
+    if not files:
+        sys.exit("No .xlsx / .csv files found.")
+
+    # Same file name in several inputs -> distinct output names (no output overwrites another)
+    stems = output_stems(files)
+    os.makedirs(args.out, exist_ok=True)
+    work_dir = os.path.join(args.out, ".work")
+    case_store = CaseStore(args.case) if args.case else None
+
+    summary = {"mode": "analyze", "files": 0, "rows": 0, "failures": [], "outputs": []}
+    perf = PerfRecorder()
+    start = time.perf_counter()
+
+    results = iter_analyses(
+        files, work_dir, workers=args.workers, case_partition=case_store is not None,
+        formatted_data=not args.summary_only, data_format=args.data_format,
+    )
+    for result in results:
+        name = os.path.basename(result["file_path"])
+        perf.merge(result["spans"])
+        if result["error"]:
+            summary["failures"].append({"file": result["file_path"], "error": result["error"]})
+            print(f"❌ {name}: {result['error']}")
+            continue
+
+        if case_store is not None:
+            # Same file key as the Streamlit page, so a file is only counted once per case
+            with open(result["file_path"], "rb") as f:
+                file_key = upload_key("analyze", [(name, f.read())])
+            with perf.span("case_store.add_partition"):
+                case_store.add_partition(file_key, name, partition_path(result["analyzed_path"]))
+        stem = stems[result["file_path"]]
+        output_path = os.path.join(args.out, f"(Analyzed)-{stem}.xlsx")
+        shutil.move(result["analyzed_path"], output_path)
+        if result["data_path"]:
+            data_path = os.path.join(args.out, f"(Data)-{stem}{BULK_FORMATS[args.data_format]}")
+            shutil.move(result["data_path"], data_path)
+            summary["outputs"].append(data_path)
+
+        summary["files"] += 1
+        summary["rows"] += result["rows"]
+        summary["outputs"].append(output_path)
+        print(f"✅ {name}: {result['rows']} rows -> {output_path}")
+
+    summary["seconds"] = time.perf_counter() - start
+    shutil.rmtree(work_dir, ignore_errors=True)
+    write_summary(summary, args.summary or os.path.join(args.out, "batch_summary.json"), perf)
+
+
+# -------------------- extract --------------------
+async def extract_all(files, model, concurrency, perf=None, pages_per_request=None, journal=None):
+    from utils.gemini_extractor import iter_extractions, MAX_CONCURRENT_REQUESTS, PAGES_PER_REQUEST
+
+    results = []
+    extractions = iter_extractions(
+        files, model, concurrency=concurrency or MAX_CONCURRENT_REQUESTS, perf=perf,
+        pages_per_request=pages_per_request or PAGES_PER_REQUEST,
+    )
+    async for result in extractions:
+        results.append(result)
+        if "error" in result:
+            print(f"❌ {result['file_name']}: {result['error']}")
+        else:
+            if journal is not None:
+                journal.append(result)
+            print(f"✅ {result['file_name']}" + (" (cached)" if result["cached"] else ""))
+    return results
+
+
+def run_extract(args):
+    from dotenv import load_dotenv
+    from multi_file_handler import handle_files
+    from utils.pdf_rasterizer import rasterize_files, RENDER_DPI
+    from utils.gemini_extractor import get_model
+    from utils.excel_writer import save_to_excel
+    from utils.perf import PerfRecorder, setup_tracing
+    from utils.extraction_journal import ExtractionJournal
+    from utils.session_cache import upload_key
+
+    paths = collect_files(args.inputs, EXTRACT_EXTENSIONS)
+    if not paths:
+        sys.exit("No image / PDF files found.")
+
+    load_dotenv()
+    setup_tracing()  # before the first request, so Gemini calls are instrumented too
+    model = get_model()
+
+    summary = {"mode": "extract", "files": len(paths), "rows": 0, "failures": [], "outputs": []}
+    perf = PerfRecorder()
+    start = time.perf_counter()
+
+    # Same inputs as an interrupted run -> the pages in its journal are not requested again
+    uploads = []
+    for path in paths:
+        with open(path, "rb") as f:
+            uploads.append((os.path.basename(path), f.read()))
+    journal = ExtractionJournal(upload_key("extract", uploads))
+    del uploads
+    done = journal.load()
+    if done:
+        print(f"♻️ Resuming: {len(done)} page(s) already in the journal {journal.path}")
+
+    message = SimpleNamespace(elements=[SimpleNamespace(path=path) for path in paths])
+    with perf.span("handle_files") as span:
+        pages = asyncio.run(handle_files(message))
+        span["rows"] = len(pages)
+    for index, page in enumerate(pages):
+        page["index"] = index
+    pages = [page for page in pages if page["index"] not in done]
+    with perf.span("pdf_render", rows=len(pages)):
+        pages = rasterize_files(pages, dpi=args.dpi or RENDER_DPI, grayscale=not args.color, workers=args.workers)
+    for page in pages:
+        if "error" in page:
+            summary["failures"].append({"file": page["file_name"], "error": page["error"]})
+    pages = [page for page in pages if "error" not in page]
+
+    with perf.span("extraction", rows=len(pages)):
+        results = asyncio.run(extract_all(pages, model, args.concurrency, perf, args.pages_per_request, journal))
+    for result in results:
+        if "error" in result:
+            summary["failures"].append({"file": result["file_name"], "error": result["error"]})
+
+    # Workbook built from the journal (this run + earlier ones) in one streaming write
+    rows = len(journal.load())
+    with perf.span("write_excel", rows=rows):
+        output_path = save_to_excel(journal.fields(), args.out)
+    if not summary["failures"]:
+        journal.remove()
+    summary["rows"] = rows
+    summary["outputs"].append(output_path)
+    summary["seconds"] = time.perf_counter() - start
+    write_summary(summary, args.summary or os.path.splitext(args.out)[0] + "_summary.json", perf)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch Excel Analyzer / Application Extractor (no UI)")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    analyze = sub.add_parser("analyze", help="Run analyze_excel over CDR files")
+    analyze.add_argument("inputs", nargs="+", help="Directories or glob patterns")
+    analyze.add_argument("--out", default="analyzed", help="Output directory")
+    analyze.add_argument("--workers", type=int, default=None, help="Parallel processes (default: CPU count)")
+    analyze.add_argument("--case", default=None, help="Also add the files to this case store")
+    analyze.add_argument("--summary", default=None, help="Summary JSON path")
+    analyze.add_argument(
+        "--summary-only", action="store_true",
+        help="Only the Mobile/Address/IMEI sheets (known layouts are read column-selectively)"
+    )
+    analyze.add_argument(
+        "--data-format", choices=["xlsx", "parquet", "csv"], default="xlsx",
+        help="Formatted Data as an xlsx sheet (split past 1,048,576 rows) or a Parquet / gzip CSV file next to it"
+    )
+    analyze.set_defaults(func=run_analyze)
+
+    extract = sub.add_parser("extract", help="Extract fields from application images / PDFs with Gemini")
+    extract.add_argument("inputs", nargs="+", help="Directories or glob patterns")
+    extract.add_argument("--out", default="extracted_data.xlsx", help="Output Excel file")
+    extract.add_argument("--concurrency", type=int, default=None, help="Gemini requests in flight")
+    extract.add_argument("--workers", type=int, default=None, help="PDF rendering processes")
+    extract.add_argument(
+        "--pages-per-request", type=int, default=None,
+        help="Pages packed into one Gemini request with a JSON reply (default: 4, 1 = one request per page)"
+    )
+    extract.add_argument("--dpi", type=int, default=None, help="PDF render resolution")
+    extract.add_argument("--color", action="store_true", help="Send color images instead of grayscale")
+    extract.add_argument("--summary", default=None, help="Summary JSON path")
+    extract.set_defaults(func=run_extract)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: old per-cell .apply normalization vs utils.mobile_normalizer
+
+Run from the repo root:
+    python -m benchmarks.bench_mobile_normalizer --rows 1000000
+"""
+import argparse
+import re
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import mobile_numbers
+from utils.mobile_normalizer import normalize_mobile_series
+
+
+def legacy_normalize(num):
+    # Copy of the old analyze_excel normalize_number + leading space apply
+    if pd.isna(num):
+        return None
+    num = re.sub(r"\D", "", str(num))
+    if num.startswith("92") and len(num) >= 12:
+        num = num[2:]
+    elif num.startswith("0") and len(num) >= 11:
+        num = num[1:]
+    return f" {num}" if re.fullmatch(r"3\d{9}", num) else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = pd.DataFrame({"A Number": mobile_numbers(args.rows, 1), "B Number": mobile_numbers(args.rows, 2)})
+
+    start = time.perf_counter()
+    legacy = {c: df[c].apply(legacy_normalize) for c in df.columns}
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = {c: normalize_mobile_series(df[c], excel_safe=True) for c in df.columns}
+    vector_time = time.perf_counter() - start
+
+    for c in df.columns:
+        pd.testing.assert_series_equal(legacy[c], vectorized[c], check_names=False)
+
+    print(f"rows per column : {args.rows:,} (A + B)")
+    print(f"legacy .apply    : {legacy_time:.2f}s")
+    print(f"vectorized       : {vector_time:.2f}s")
+    print(f"speedup          : {legacy_time / vector_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark harness for read_excel_auto, analyze_excel and extract_fields_from_text.
+
+Each stage runs in a fresh process so its wall time and peak memory are
+measured on their own. Results can be saved as a baseline and later runs
+are compared against it.
+
+Run from the repo root:
+    python -m benchmarks.run_benchmarks --sizes 10k,100k
+    python -m benchmarks.run_benchmarks --sizes 10k,100k --save-baseline
+    python -m benchmarks.run_benchmarks --sizes 10k,100k --check   # exit 1 on regression
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import EXCEL_MAX_ROWS, cached_file, make_application_texts, parse_size
+from utils.perf import peak_rss_mb
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+# A stage is a regression when it is this much slower than the baseline
+REGRESSION_RATIO = 1.25
+
+
+# -------------------- Stages (run inside the child process) --------------------
+def stage_read_excel_auto(path):
+    from utils.table_header_finder import read_excel_auto
+    return len(read_excel_auto(path))
+
+
+def stage_analyze_excel(path):
+    from utils.Excel_analyzer import analyze_excel
+    stats = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        analyze_excel(path, output_dir=out_dir, stats=stats)
+    return stats["rows"]
+
+
+def stage_extract_fields(count):
+    from utils.extract_fields import extract_fields_from_text
+    texts = make_application_texts(count)
+    for text in texts:
+        extract_fields_from_text(text)
+    return count
+
+
+STAGES = {
+    "read_excel_auto": stage_read_excel_auto,
+    "analyze_excel": stage_analyze_excel,
+    "extract_fields_from_text": stage_extract_fields,
+}
+
+
+def _child(stage, arg, queue):
+    import warnings
+    warnings.simplefilter("ignore")
+    start = time.perf_counter()
+    rows = STAGES[stage](arg)
+    queue.put({"seconds": time.perf_counter() - start, "rows": rows, "peak_rss_mb": peak_rss_mb()})
+
+
+def measure(stage, arg):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(stage, arg, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+# -------------------- Harness --------------------
+def build_cases(sizes, formats):
+    cases = []
+    for rows in sizes:
+        for kind in formats:
+            if kind == "xlsx" and rows > EXCEL_MAX_ROWS:
+                continue  # does not fit one sheet
+            path = cached_file(DATA_DIR, kind, rows)
+            if kind == "xlsx":
+                cases.append((f"read_excel_auto[xlsx-{rows}]", "read_excel_auto", path))
+            cases.append((f"analyze_excel[{kind}-{rows}]", "analyze_excel", path))
+    return cases
+
+
+def compare(results, baseline):
+    regressions = []
+    print(f"\n{'case':45} {'seconds':>9} {'rows/s':>11} {'peak MB':>9} {'vs base':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        ratio = result["seconds"] / base["seconds"] if base and base["seconds"] else None
+        flag = ""
+        if ratio and ratio > REGRESSION_RATIO:
+            flag = "  <-- slower"
+            regressions.append(name)
+        print(
+            f"{name:45} {result['seconds']:9.2f} {result['rows_per_sec']:11.0f} "
+            f"{result['peak_rss_mb'] if result['peak_rss_mb'] is not None else '-':>9} "
+            f"{(f'{ratio:.2f}x' if ratio else '-'):>8}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10k,100k", help="Comma separated row counts, e.g. 10k,100k,1M,5M")
+    parser.add_argument("--formats", default="xlsx,csv")
+    parser.add_argument("--texts", type=int, default=20000, help="Application texts for extract_fields_from_text")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Exit with 1 when a stage regressed")
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    cases = build_cases(sizes, args.formats.split(","))
+    cases.append((f"extract_fields_from_text[{args.texts}]", "extract_fields_from_text", args.texts))
+
+    results = {}
+    for name, stage, arg in cases:
+        result = measure(stage, arg)
+        result["rows_per_sec"] = result["rows"] / result["seconds"] if result["seconds"] else 0.0
+        results[name] = result
+        print(f"{name}: {result['seconds']:.2f}s", flush=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(), "results": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if args.check and regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cold start and rerun latency of the Streamlit app (main.py), per page.
+
+Every page is measured in a fresh interpreter with streamlit's AppTest:
+the first run of the script includes the imports it triggers (cold start),
+the following runs are reruns of the same session. Also reports which heavy
+modules ended up loaded.
+
+Run from the repo root:
+    python -m benchmarks.startup_time
+    git show <rev>:main.py > main_old.py && python -m benchmarks.startup_time --script main_old.py
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+PAGES = ["app", "analyzer", "settings"]
+HEAVY_MODULES = ["pandas", "pyarrow", "openpyxl", "xlsxwriter", "fitz", "google.generativeai"]
+
+# Runs inside the child interpreter: argv = script, page, reruns
+CHILD = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+script, page, reruns = sys.argv[1], sys.argv[2], int(sys.argv[3])
+at = AppTest.from_file(script, default_timeout=120)
+at.session_state["page"] = page
+
+start = time.perf_counter()
+at.run()
+cold = time.perf_counter() - start
+
+times = []
+for _ in range(reruns):
+    start = time.perf_counter()
+    at.run()
+    times.append(time.perf_counter() - start)
+
+print(json.dumps({
+    "cold_seconds": cold,
+    "rerun_seconds": sorted(times)[len(times) // 2] if times else None,
+    "errors": [str(e.message) for e in at.exception],
+    "heavy_modules": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure(script, page, reruns):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, script, page, str(reruns)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--script", default="main.py", help="Streamlit script to measure")
+    parser.add_argument("--pages", default=",".join(PAGES))
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns after the cold start (median is reported)")
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for page in args.pages.split(","):
+        result = measure(args.script, page, args.reruns)
+        results[page] = result
+        rerun = f"{result['rerun_seconds'] * 1000:.0f}ms" if result["rerun_seconds"] is not None else "-"
+        print(
+            f"{page}: cold {result['cold_seconds']:.2f}s, rerun {rerun}, "
+            f"loaded: {', '.join(result['heavy_modules']) or 'none'}"
+            + (f"  ERRORS: {result['errors']}" if result["errors"] else ""),
+            flush=True,
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"script": args.script, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
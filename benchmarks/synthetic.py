@@ -0,0 +1,159 @@
+"""
+Seeded synthetic data for the benchmarks:
+- operator CDR workbooks / CSVs (junk rows above the header, mixed +92/92/0
+  numbers, IMEI, cell-site address and date columns)
+- Gemini-style application text responses
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# Excel sheet limit (header row included)
+EXCEL_MAX_ROWS = 1_048_576
+
+# Column names per operator layout (as seen in real exports)
+LAYOUTS = {
+    "jazz": {"a": "A Number", "b": "B Number", "type": "Call Type", "imei": "IMEI",
+             "date": "Start Time", "address": "Address", "duration": "Duration"},
+    "zong": {"a": "ANUMBER", "b": "BNUMBER", "type": "CALL_TYPE", "imei": "IMEI",
+             "date": "CALL_START_DT_TM", "address": "SITE_ADDRESS", "duration": "DURATION"},
+    "ufone": {"a": "A party", "b": "b party", "type": "Call Type", "imei": "Imei number",
+              "date": "STRT_TM", "address": "Location", "duration": "Duration"},
+    "telenor": {"a": "Aparty", "b": "BParty", "type": "Type", "imei": "IMEI",
+                "date": "Datetime", "address": "SiteLocation", "duration": "Duration"},
+}
+
+DATE_FORMATS = {
+    "jazz": "%d/%m/%Y %H:%M:%S",
+    "zong": "%Y-%m-%d %H:%M:%S",
+    "ufone": "%d-%b-%Y %I:%M:%S %p",
+    "telenor": "%Y%m%d%H%M%S",
+}
+
+JUNK_ROWS = [
+    ["Call Detail Record"],
+    ["Generated on", "2025-07-01"],
+    [],
+]
+
+
+def parse_size(text):
+    """'10k' -> 10000, '5M' -> 5000000"""
+    text = str(text).strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+def mobile_numbers(rows, seed=0, pool=None):
+    """
+    Mobile numbers in mixed formats (3XXXXXXXXX, 03.., 92.., +92.., with spaces),
+    with a few empty / junk cells like real exports.
+    """
+    rng = np.random.default_rng(seed)
+    if pool:
+        base = rng.integers(3000000000, 3000000000 + pool, size=rows).astype(str)
+    else:
+        base = rng.integers(3000000000, 3499999999, size=rows).astype(str)
+    prefixes = np.array(["", "0", "92", "+92", "+92 ", "0"])[rng.integers(0, 6, size=rows)]
+    numbers = pd.Series(np.char.add(prefixes, base), dtype=object)
+    numbers[rng.random(rows) < 0.02] = None
+    numbers[rng.random(rows) < 0.01] = "UNKNOWN"
+    return numbers
+
+
+def make_cdr_frame(rows, seed=0, operator="jazz"):
+    """
+    One subscriber's CDR: a single A number, a few thousand B numbers,
+    a few hundred cell sites and a handful of IMEIs.
+    """
+    rng = np.random.default_rng(seed)
+    layout = LAYOUTS[operator]
+
+    start = pd.Timestamp("2025-01-01")
+    offsets = np.sort(rng.integers(0, 180 * 24 * 3600, size=rows))
+    dates = (start + pd.to_timedelta(offsets, unit="s")).strftime(DATE_FORMATS[operator])
+
+    sites = np.array([f"Site {i} Sector {i % 3 + 1}, Karachi" for i in range(300)])
+    imeis = (354882089097000 + rng.integers(0, 1000, size=6)).astype(str)
+
+    return pd.DataFrame({
+        layout["a"]: "0300" + "1234567",
+        layout["b"]: mobile_numbers(rows, seed + 1, pool=5000),
+        layout["type"]: np.array(["MO", "MT", "SMS-MO", "SMS-MT"])[rng.integers(0, 4, size=rows)],
+        layout["imei"]: imeis[rng.integers(0, len(imeis), size=rows)],
+        layout["date"]: dates,
+        layout["address"]: sites[rng.integers(0, len(sites), size=rows)],
+        layout["duration"]: rng.integers(0, 900, size=rows),
+    })
+
+
+def write_cdr_xlsx(path, rows, seed=0, operator="jazz"):
+    """
+    Operator style workbook: junk rows, then the header, then the data.
+    Rows are capped at the Excel sheet limit.
+    """
+    rows = min(rows, EXCEL_MAX_ROWS - len(JUNK_ROWS) - 1)
+    df = make_cdr_frame(rows, seed, operator)
+
+    book = xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_numbers": False})
+    ws = book.add_worksheet("CDR")
+    row = 0
+    for junk in JUNK_ROWS:
+        ws.write_row(row, 0, junk)
+        row += 1
+    ws.write_row(row, 0, list(df.columns))
+    for values in df.itertuples(index=False, name=None):
+        row += 1
+        ws.write_row(row, 0, values)
+    book.close()
+    return path
+
+
+def write_cdr_csv(path, rows, seed=0, operator="zong"):
+    """Operator style CSV (header on the first line)."""
+    make_cdr_frame(rows, seed, operator).to_csv(path, index=False)
+    return path
+
+
+def cached_file(data_dir, kind, rows, seed=0, operator=None):
+    """
+    Generate a benchmark file once and reuse it: kind is "xlsx" or "csv".
+    """
+    operator = operator or ("jazz" if kind == "xlsx" else "zong")
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"cdr_{operator}_{rows}_{seed}.{kind}")
+    if not os.path.exists(path):
+        writer = write_cdr_xlsx if kind == "xlsx" else write_cdr_csv
+        writer(path + ".tmp." + kind, rows, seed, operator)
+        os.replace(path + ".tmp." + kind, path)
+    return path
+
+
+def make_application_texts(count, seed=0):
+    """
+    Plain-text replies in the format the extractor prompt asks Gemini for.
+    """
+    rng = np.random.default_rng(seed)
+    names = ["Furqan Ur Rehman", "Muhammad Ali", "Ayesha Khan", "Bilal Ahmed", "Sana Iqbal"]
+    models = ["Motrolla Edge Plus", "Samsung A52", "Infinix Hot 12", "Oppo A16", "iPhone 11"]
+    stations = ["ZamanTown", "Korangi", "Landhi", "Shah Faisal", "Gulshan"]
+    types = ["Snatched", "Theft", "Lost"]
+
+    texts = []
+    for _ in range(count):
+        imeis = " ".join(str(354882089090000 + rng.integers(0, 9999)) for _ in range(rng.integers(1, 3)))
+        texts.append(
+            f"Name: {names[rng.integers(len(names))]}\n"
+            f"Phone Number: 03{rng.integers(10, 49)}-{rng.integers(1000000, 9999999)}\n"
+            f"IMEI Number: {imeis}\n"
+            f"last Num Used: {'None' if rng.random() < 0.5 else '0313-0282044'}\n"
+            f"Mobile Model: {models[rng.integers(len(models))]}\n"
+            f"Other Property: {'None' if rng.random() < 0.6 else 'Cash 3000'}\n"
+            f"Date Of Offence: {rng.integers(1, 28):02d}.{rng.integers(1, 12):02d}.2025\n"
+            f"Time Of Offence: {rng.integers(1, 12):02d}:{rng.integers(0, 59):02d} PM\n"
+            f"Type: {types[rng.integers(len(types))]}\n"
+            f"Police Station: {stations[rng.integers(len(stations))]}"
+        )
+    return texts
@@ -1,20 +1,31 @@
-import os
-import fitz  # PyMuPDF
+import time
 import streamlit as st
 from dotenv import load_dotenv
-import google.generativeai as genai
-from utils.extract_fields import extract_fields_from_text
-from utils.excel_writer import save_to_excel
-from multi_file_handler import handle_files
-from utils.Excel_analyzer import analyze_excel
-import asyncio
-import time
-import zipfile
-import io
-
-# Load Gemini API key
+from utils.session_cache import SessionWorkdir, result_cache, upload_key
+from utils.perf import setup_tracing
+from utils.job_queue import job_queue, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+from utils.app_jobs import extract_job, analyze_job
+
+# Streamlit reruns this script on every interaction: only light modules are imported here.
+# pandas / PyMuPDF / Gemini are imported by the page (or job) that needs them, once per
+# process, and the Gemini model is configured on first use (utils.gemini_extractor.get_model).
+# python -m benchmarks.startup_time measures cold start and rerun time per page.
+
+# Seconds between reruns of a page while its background job is running
+POLL_SECONDS = 1.0
+
+# Where the Excel Analyzer writes the Formatted Data (all normalized rows)
+DATA_FORMAT_LABELS = {
+    "xlsx": "Excel sheet (split into parts past 1,048,576 rows)",
+    "parquet": "Parquet file (fast, for large CDRs)",
+    "csv": "CSV file, gzip (fast, for large CDRs)",
+}
+
+# Load Gemini API key (read when the first extraction job configures Gemini)
 load_dotenv()
-genai.configure(api_key=os.getenv("gemini_keys"))
+
+# OpenTelemetry export (only when OTEL_EXPORTER_OTLP_ENDPOINT is set)
+setup_tracing()
 
 # ---------- Page Config ----------
 st.set_page_config(page_title="Urdu Police App & Excel Analyzer", layout="wide")
@@ -23,6 +34,10 @@ st.set_page_config(page_title="Urdu Police App & Excel Analyzer", layout="wide")
 if "page" not in st.session_state:
     st.session_state.page = "app"  # default page
 
+# Private work directory per session (removed when the session ends)
+if "workdir" not in st.session_state:
+    st.session_state.workdir = SessionWorkdir()
+
 # ---------- Sidebar ----------
 with st.sidebar:
     st.image("Assets/app_icon.png", width=100)
@@ -35,30 +50,96 @@ with st.sidebar:
     if st.button("⚙️ Settings / Future Tools"):
         st.session_state.page = "settings"
 
-# ---------- Rate Limiting Setup ----------
-REQUEST_LIMIT = 10   # max 10 requests
-TIME_WINDOW = 60     # in seconds (1 min)
-request_times = []   # store timestamps of last requests
+    st.checkbox("📊 Show performance panel", key="show_perf")
+
+
+def show_perf_panel(perf, title, exported=False):
+    """
+    Per-stage timings of the last run as a table and a JSON download.
+    exported: the job already sent the spans as an OpenTelemetry trace
+    (when OTEL_EXPORTER_OTLP_ENDPOINT is set), the panel only says so.
+    """
+    if not st.session_state.get("show_perf"):
+        return
+    with st.expander(f"📊 Performance – {title}", expanded=True):
+        st.dataframe(perf.to_list(), use_container_width=True)
+        st.caption("Spans of parallel work (processes / concurrent requests) overlap, so their sum can exceed the wall time.")
+        st.download_button(
+            label="📥 Download timings (JSON)",
+            data=perf.to_json(),
+            file_name=f"perf_{title.lower().replace(' ', '_')}.json",
+            mime="application/json"
+        )
+        if exported:
+            st.caption("📡 Spans exported to the OpenTelemetry collector.")
+
+def once_per_session(name, key, fn):
+    """fn() computed once per session for the same key, not again on every rerun."""
+    entry = st.session_state.get(name)
+    if entry is None or entry["key"] != key:
+        entry = {"key": key, "value": fn()}
+        st.session_state[name] = entry
+    return entry["value"]
+
+
+def uploads_key(kind, files):
+    """upload_key() of uploaded files, hashed once per upload instead of on every rerun."""
+    file_ids = tuple(f.file_id for f in files)
+    return once_per_session(
+        f"{kind}_upload_key", file_ids, lambda: upload_key(kind, [(f.name, f.getvalue()) for f in files])
+    )
+
+
+def session_job(name, key):
+    """This session's background job for the given input (name: session slot, key: upload hash), or None."""
+    entry = st.session_state.get(name)
+    if entry is None or entry["key"] != key:
+        return None
+    return job_queue.get(entry["id"])
+
+
+def start_job(name, key, kind, fn, *args):
+    """Queue fn(job, workdir, *args) and remember its ID in the session (survives reruns)."""
+    workdir = st.session_state.workdir
+    job = job_queue.submit(kind, fn, workdir, *args, owner=workdir.path)
+    st.session_state[name] = {"key": key, "id": job.id}
+    return job
+
 
-def check_rate_limit():
-    """Ensure only 10 requests per minute are sent."""
-    global request_times
-    now = time.time()
-    # Keep only timestamps from the last 60s
-    request_times = [t for t in request_times if now - t < TIME_WINDOW]
+def show_job(job, name):
+    """Messages, progress and cancel / run-again buttons of a background job."""
+    for level, text in job.events():
+        getattr(st, level)(text)
+    if job.status == QUEUED:
+        st.info(f"🕒 Queued, {job_queue.pending_before(job)} job(s) ahead ...")
+    elif job.status == RUNNING:
+        st.progress(job.progress, text=job.message)
+    elif job.status == FAILED:
+        st.error(f"❌ Job failed: {job.error}")
+    elif job.status == CANCELLED:
+        st.warning("🛑 Job cancelled.")
 
-    if len(request_times) >= REQUEST_LIMIT:
-        wait_time = TIME_WINDOW - (now - request_times[0])
-        st.warning(f"⏳ Rate limit reached! Waiting {int(wait_time)}s before next request...")
-        time.sleep(wait_time)
+    if not job.done:
+        if st.button("🛑 Cancel", key=f"cancel_{job.id}"):
+            job_queue.cancel(job.id)
+    elif job.status in (FAILED, CANCELLED) and st.button("🔁 Run again", key=f"again_{job.id}"):
+        del st.session_state[name]
+        st.rerun()
+
+
+def poll(job):
+    """Rerun the page until the job is finished (the job itself keeps running between reruns)."""
+    if job is not None and not job.done:
+        time.sleep(POLL_SECONDS)
+        st.rerun()
 
-    # Add current request timestamp
-    request_times.append(time.time())
 
 # ---------- Page Logic ----------
 
 # -------------------- Application Extractor --------------------
 if st.session_state.page == "app":
+    from utils.gemini_extractor import PAGES_PER_REQUEST
+
     st.title("📝 Urdu Police Application Extractor")
     
     uploaded_files = st.file_uploader(
@@ -66,101 +147,66 @@ if st.session_state.page == "app":
         type=["jpg", "jpeg", "png", "pdf"],
         accept_multiple_files=True
     )
+    batch_pages = st.checkbox(
+        f"📦 Send up to {PAGES_PER_REQUEST} pages per Gemini request (fewer requests against the per-minute quota)",
+        value=True
+    )
 
     if uploaded_files:
-        st.info("🔍 Processing files. Please wait...")
-
-        # Create temp folder
-        os.makedirs("temp_uploads", exist_ok=True)
-
-        # Convert Streamlit UploadedFile to compatible message format
-        class FakeMessage:
-            def __init__(self, files):
-                self.elements = []
-                for f in files:
-                    temp_path = os.path.join("temp_uploads", f.name)
+        workdir = st.session_state.workdir
+        extract_key = uploads_key("extract", uploaded_files)
+        job = session_job("extract_job", extract_key)
+
+        # Same upload as before (e.g. another session) -> reuse the stored results
+        results = result_cache.get_json(extract_key) if job is None else None
+
+        if results is not None:
+            st.success("♻️ Results for this upload loaded from cache.")
+            for result in results:
+                st.text_area(f"📝 Extracted Text ({result['file_name']}):", result["raw_text"], height=200)
+            # Save to Excel (inside this session's work directory) in one streaming write, once per upload
+            def write_excel():
+                from utils.excel_writer import save_to_excel
+                return save_to_excel((r["fields"] for r in results), workdir.file("extracted_data.xlsx"))
+
+            excel_path = once_per_session("cached_excel", extract_key, write_excel)
+        else:
+            if job is None:
+                # The extraction runs as a background job: it keeps going across reruns and page switches
+                file_paths = []
+                for number, f in enumerate(uploaded_files):
+                    # Numbered, so uploads with the same file name do not overwrite each other
+                    temp_path = workdir.file(f"{number}-{f.name}")
                     with open(temp_path, "wb") as out_f:
                         out_f.write(f.getbuffer())
-                    self.elements.append(type("Element", (), {"path": temp_path})())
-
-        message = FakeMessage(uploaded_files)
-
-        # Handle files
-        file_data = asyncio.run(handle_files(message))
-        all_extracted_data = []
-
-        for file in file_data:
-            if "error" in file:
-                st.error(f"❌ {file['file_name']}: {file['error']}")
-                continue
-
-            path = file["path"]
-            ext = os.path.splitext(path)[1].lower()
-
-            # Prepare image bytes
-            if ext == ".pdf":
-                doc = fitz.open(path)
-                page_num = int(file["file_name"].split("Page ")[1]) - 1
-                pix = doc.load_page(page_num).get_pixmap()
-                image_bytes = pix.tobytes("png")
-            else:
-                with open(path, "rb") as f:
-                    image_bytes = f.read()
-
-            st.info(f"Processing file: {file['file_name']}")
-
-            prompt = (
-                "From this handwritten Urdu police application image, extract ONLY the following fields. "
-                "Translate the content into English if needed and follow fields Example stricly and return Plain Text only\n\n"
-                "Fields Example:\n"
-                """Name: Furqan Ur Rehman (only applicant name)
-                Phone Number: 0313-0282098 (Mention in Last)
-                IMEI Number: 354882089097706 354882089094534
-                last Num Used: 0313-0282044 or None
-                Mobile Model: Motrolla Edge Plus
-                Other Property: None / Cash 3000 / wallet / bike  etc
-                Date Of Offence: 29.06.2025 only use . instead /
-                Time Of Offence: 08:00 PM
-                Type: Snatched / Theft / Lost
-                Police Station: ZamanTown"""
-            )
-
-            # ✅ Apply Rate Limit before every request
-            check_rate_limit()
-
-            model = genai.GenerativeModel("gemini-2.0-flash")
-
-            try:
-                response = model.generate_content(
-                    [
-                        prompt,
-                        {
-                            "mime_type": "image/jpeg",
-                            "data": image_bytes
-                        }
-                    ]
-                )
-                raw_text = response.text
-            except Exception as e:
-                st.error(f"❌ Gemini Vision error: {str(e)}")
-                continue
+                    file_paths.append(temp_path)
+                pages_per_request = PAGES_PER_REQUEST if batch_pages else 1
+                job = start_job("extract_job", extract_key, "extract", extract_job, file_paths, extract_key, pages_per_request)
 
-            st.text_area(f"📝 Extracted Text ({file['file_name']}):", raw_text, height=200)
+            show_job(job, "extract_job")
+            # Pages are shown as they finish (journaled pages of an earlier run first)
+            for result in job.items():
+                st.text_area(f"📝 Extracted Text ({result['file_name']}):", result["raw_text"], height=200)
 
-            extracted_data = extract_fields_from_text(raw_text)
-            all_extracted_data.append(extracted_data)
+            excel_path = None
+            if job.status == DONE:
+                from utils.gemini_cache import gemini_cache
 
-        # Save to Excel
-        excel_path = save_to_excel(all_extracted_data)
+                show_perf_panel(job.result["perf"], "Application Extractor", job.result["exported"])
+                stats = gemini_cache.stats()
+                st.caption(f"🗄️ Gemini cache: {stats['hits']} hits / {stats['misses']} misses ({stats['entries']} stored)")
+                excel_path = job.result["excel_path"]
 
         # Download button
-        with open(excel_path, "rb") as f:
-            st.download_button(
-                label="📥 Download Extracted Excel",
-                data=f,
-                file_name="extracted_data.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+        if excel_path:
+            with open(excel_path, "rb") as f:
+                st.download_button(
+                    label="📥 Download Extracted Excel",
+                    data=f,
+                    file_name="extracted_data.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+        poll(job)
 
 # -------------------- Excel Analyzer --------------------
 elif st.session_state.page == "analyzer":
@@ -173,34 +219,97 @@ elif st.session_state.page == "analyzer":
         accept_multiple_files=True,
         key="analyzer_uploader"
     )
+    case_id = st.text_input("Case ID (optional) – files with the same Case ID are consolidated", key="case_id").strip()
+    case_store = None
+    if case_id:
+        from utils.case_store import CaseStore
+        case_store = CaseStore(case_id)
+    data_format = st.radio(
+        "Formatted Data output",
+        list(DATA_FORMAT_LABELS),
+        format_func=DATA_FORMAT_LABELS.get,
+        horizontal=True,
+        key="data_format",
+    )
 
+    job = None
     if uploaded_files:
-        os.makedirs("temp_uploads", exist_ok=True)
-        zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, "w") as zipf:
-            for uploaded_file in uploaded_files:
-                temp_path = os.path.join("temp_uploads", uploaded_file.name)
+        workdir = st.session_state.workdir
+        batch_key = f"{uploads_key('analyze', uploaded_files)}-{case_id}-{data_format}"
+        job = session_job("analyze_job", batch_key)
+
+        if job is None:
+            from utils.bulk_writer import BULK_FORMATS
+
+            pending = {}
+            cached = []
+            for number, uploaded_file in enumerate(uploaded_files):
+                # Files analyzed before (same content, same output format) come straight from the result cache
+                analyze_key = upload_key("analyze", [(uploaded_file.name, uploaded_file.getvalue())])
+                cache_key = analyze_key if data_format == "xlsx" else f"{analyze_key}-{data_format}"
+                analyzed_path = result_cache.get_path(cache_key)
+                data_path = result_cache.get_path(cache_key, BULK_FORMATS[data_format]) if data_format != "xlsx" else None
+                # A file that is not in the case yet is analyzed again to get its case partition
+                if analyzed_path and (data_format == "xlsx" or data_path) and (
+                    case_store is None or analyze_key in case_store
+                ):
+                    cached.append((uploaded_file.name, analyzed_path, data_path))
+                    continue
+
+                # Numbered, so uploads with the same file name do not overwrite each other
+                temp_path = workdir.file(f"{number}-{uploaded_file.name}")
                 with open(temp_path, "wb") as f:
                     f.write(uploaded_file.getbuffer())
+                pending[temp_path] = (uploaded_file.name, analyze_key, cache_key)
+
+            # The analysis runs as a background job: it keeps going across reruns and page switches
+            job = start_job("analyze_job", batch_key, "analyze", analyze_job, pending, cached, case_id, data_format)
+            for name, *_ in cached:
+                job.log("success", f"♻️ {name} loaded from cache.")
+
+        show_job(job, "analyze_job")
+
+        if job.status == DONE:
+            perf = job.result["perf"]
+            if perf.to_list():
+                show_perf_panel(perf, "Excel Analyzer", job.result["exported"])
+
+            # Final zip download
+            with open(job.result["zip_path"], "rb") as f:
+                st.download_button(
+                    label="📦 Download All Analyzed Files (ZIP)",
+                    data=f,
+                    file_name="Analyzed_Files.zip",
+                    mime="application/zip"
+                )
 
-                try:
-                    st.write(f"⏳ Processing file: **{uploaded_file.name}** ...")
-                    analyzed_path = analyze_excel(temp_path)
-                    st.success(f"✅ {uploaded_file.name} analyzed successfully!")
+    # -------------------- Consolidated case view --------------------
+    # (not while files of this case are still being added)
+    if (job is None or job.done) and case_store is not None and case_store.manifest()["files"]:
+        manifest = case_store.manifest()
+        st.subheader(f"🗂️ Case {case_id}: {len(manifest['files'])} file(s)")
 
-                    zipf.write(analyzed_path, arcname="(Analyzed)-" + uploaded_file.name)
-                except Exception as e:
-                    st.error(f"❌ Error in {uploaded_file.name}: {str(e)}")
+        def consolidate():
+            # Only values seen in more than one file
+            sheets = {sheet: df[df["Files"] > 1].head(100) for sheet, df in case_store.consolidated().items()}
+            return sheets, case_store.export_excel(st.session_state.workdir.file("Consolidated.xlsx"))
 
-        # Final zip download
-        zip_buffer.seek(0)
-        st.download_button(
-            label="📦 Download All Analyzed Files (ZIP)",
-            data=zip_buffer,
-            file_name="Analyzed_Files.zip",
-            mime="application/zip"
+        # Built again only when files were added to the case, not on every rerun
+        sheets, consolidated_path = once_per_session(
+            "consolidated", (case_id, tuple(sorted(manifest["files"]))), consolidate
         )
+        for sheet, df in sheets.items():
+            st.markdown(f"**{sheet}** (recurring across files)")
+            st.dataframe(df, use_container_width=True)
+
+        with open(consolidated_path, "rb") as f:
+            st.download_button(
+                label="📥 Download Consolidated Case Excel",
+                data=f,
+                file_name=f"Consolidated-{case_id}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+    poll(job)
 
 # -------------------- Settings / Future Tools --------------------
 elif st.session_state.page == "settings":
@@ -6,6 +6,7 @@ async def handle_files(message):
     """
     Return a list of dicts with file names and paths.
     For PDFs, each page gets a virtual path: "file.pdf - Page 1"
+    and its 0-based "page_index" (pages are rendered later by utils.pdf_rasterizer)
     """
     results = []
 
@@ -21,9 +22,10 @@ async def handle_files(message):
 
         elif ext == ".pdf":
             try:
-                doc = fitz.open(file_path)
-                for page_num in range(len(doc)):
-                    results.append({"file_name": f"{os.path.basename(file_path)} - Page {page_num+1}", "path": file_path})
+                with fitz.open(file_path) as doc:
+                    page_count = doc.page_count
+                for page_num in range(page_count):
+                    results.append({"file_name": f"{os.path.basename(file_path)} - Page {page_num+1}", "path": file_path, "page_index": page_num})
             except:
                 continue
 
@@ -1,174 +1,343 @@
 import pandas as pd
 import os
-import re
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.utils import get_column_letter
 from utils.table_header_finder import read_excel_auto
+from utils.mobile_normalizer import normalize_mobile_columns
+from utils.compact_frame import compact_frame, excel_text_columns, value_counts
+from utils.styled_writer import StyledExcelWriter
+from utils.case_store import CasePartitionWriter, CASE_PARTITION_NAME
+from utils.perf import NO_PERF
+from utils.layout_registry import header_fingerprint, layout_registry
+from utils.date_parser import date_format_fits, infer_date_format, parse_dates
+from utils.bulk_writer import BulkDataWriter, BULK_FORMATS
 
+# Rows per chunk when a CSV is streamed (keeps memory bounded on multi-GB dumps)
+CSV_CHUNK_ROWS = 100_000
 
-def analyze_excel(file_path):
+
+# Known column aliases per role (compared stripped + lowercased)
+A_NUMBER_ALIASES = ["A Number", "ANUMBER", "a number", "A party", "A_party" , "Aparty"]
+B_NUMBER_ALIASES = ["B Number", "BNUMBER", "b number", "b party", "b_party", "CALL_DIALED_NUM" ,"BParty"]
+ADDRESS_ALIASES = ["Address", "Location", "Addr","SITE_ADDRESS","SiteLocation"]
+IMEI_ALIASES = ["IMEI", "imei", "Imei number", "IMEI numbe"]
+DATE_ALIASES = ["CALL_START_DT_TM", "Start Date", "Start Time", "Date" ,"STRT_TM" ,"Datetime"]
+
+# Lowercased once instead of for every column
+_ALIAS_SETS = {
+    role: {alias.lower() for alias in aliases}
+    for role, aliases in (
+        ("a", A_NUMBER_ALIASES), ("b", B_NUMBER_ALIASES), ("address", ADDRESS_ALIASES),
+        ("imei", IMEI_ALIASES), ("date", DATE_ALIASES),
+    )
+}
+
+
+def find_columns(columns):
     """
-    Enhanced Professional Excel Analyzer:
-    - Clean & normalize mobile numbers (03XXXXXXXXX or 92XXXXXXXXXX or +92XXXXXXXXXX)
-    - Add space before numeric-only columns (for Excel text format)
-    - Keep only valid A/B numbers
+    Identify the A/B number, address, IMEI and date columns by their known aliases.
+    Raises ValueError when there is no B number column.
     """
+    found = {"a": None, "b": None, "address": None, "imei": None, "date": None}
+    for col in columns:
+        clean_col = str(col).strip().lower()
+        # A/B: the last matching column wins, the others keep the first match
+        if clean_col in _ALIAS_SETS["a"]:
+            found["a"] = col
+        if clean_col in _ALIAS_SETS["b"]:
+            found["b"] = col
+        for role in ("address", "imei", "date"):
+            if found[role] is None and clean_col in _ALIAS_SETS[role]:
+                found[role] = col
 
-    # -------------------- Read Excel --------------------
-    file_ext = os.path.splitext(file_path)[1].lower()
-    if file_ext == ".csv":
-        df = pd.read_csv(file_path)
-        # Save temporary Excel version for uniform processing
-        temp_excel_path = os.path.splitext(file_path)[0] + "_converted.xlsx"
-        df.to_excel(temp_excel_path, index=False)
-        file_path = temp_excel_path
-    else:
-        df = read_excel_auto(file_path)
+    if not found["b"]:
+        raise ValueError("No valid B Number column found (expected: B Number, b party, CALL_DIALED_NUM, etc.)")
+    return found
 
-    # -------------------- Identify A & B Number Columns --------------------
-    possible_a_cols = ["A Number", "ANUMBER", "a number", "A party", "A_party" , "Aparty"]
-    possible_b_cols = ["B Number", "BNUMBER", "b number", "b party", "b_party", "CALL_DIALED_NUM" ,"BParty"]
 
-    a_col = None
-    b_col = None
+def layout_columns(columns, fingerprint, header_row=0, kind="xlsx", registry=layout_registry):
+    """
+    find_columns() through the layout registry: a known header fingerprint
+    returns the remembered roles, a new one is detected and remembered.
+    """
+    layout = registry.get(fingerprint) if fingerprint else None
+    if layout and layout.get("roles"):
+        # columns may be a role-only selection here, the stored full header is kept
+        registry.remember(fingerprint)
+        return layout["roles"]
 
-    for col in df.columns:
-        clean_col = col.strip().lower()
-        if clean_col in [c.lower() for c in possible_a_cols]:
-            a_col = col
-        if clean_col in [c.lower() for c in possible_b_cols]:
-            b_col = col
+    cols = find_columns(columns)
+    if fingerprint:
+        registry.remember(fingerprint, kind=kind, header_row=header_row, columns=list(columns), roles=cols)
+    return cols
 
-    if not b_col:
-        raise ValueError("No valid B Number column found (expected: B Number, b party, CALL_DIALED_NUM, etc.)")
 
-    # -------------------- Smart Mobile Normalization --------------------
-    def normalize_number(num):
-        if pd.isna(num):
-            return None
-        num = str(num)
-        num = re.sub(r"\D", "", num)  # remove non-digits
+def layout_date_format(series, fingerprint, registry=layout_registry):
+    """
+    Format of a layout's date column: remembered from an earlier file of the layout
+    when it still parses a sample of this column, otherwise inferred on the sample
+    and remembered.
+    """
+    layout = registry.get(fingerprint) if fingerprint else None
+    known = layout.get("date_format") if layout else None
+    if known and date_format_fits(series, known):
+        return known
+    fmt = infer_date_format(series)
+    if fmt and fingerprint and fmt != known:
+        registry.remember(fingerprint, hit=False, date_format=fmt)
+    return fmt
 
-        # Handle formats: +92300..., 92300..., 0300...
-        if num.startswith("92") and len(num) >= 12:
-            num = num[2:]
-        elif num.startswith("0") and len(num) >= 11:
-            num = num[1:]
 
-        # Now must start with 3 and be 10 digits
-        return num if re.fullmatch(r"3\d{9}", num) else None
+class AnalysisTotals:
+    """
+    Mobile / Address / IMEI aggregations accumulated chunk by chunk.
+    A single chunk gives exactly the same sheets as analysing the whole frame.
+    """
 
-    # -------------------- Clean A & B Columns --------------------
-    if a_col:
-        df[a_col] = df[a_col].apply(normalize_number)
-        df[a_col] = df[a_col].apply(lambda x: f" {x}" if pd.notna(x) else None)
+    def __init__(self, cols, perf=None):
+        self.cols = cols
+        self.perf = perf or NO_PERF
+        self.rows = 0
+        self.mobile_counts = None
+        self.address_counts = None
+        self.imei_stats = None
 
-    df[b_col] = df[b_col].apply(normalize_number)
-    df[b_col] = df[b_col].apply(lambda x: f" {x}" if pd.notna(x) else None)
+    @staticmethod
+    def _add_counts(total, counts):
+        if total is None:
+            return counts
+        return total.add(counts, fill_value=0).astype("int64").sort_values(ascending=False)
 
-    # -------------------- Create Mobile Count Sheet --------------------
-    mobile_series = df[b_col].dropna()
-    mobile_count = mobile_series.value_counts().reset_index()
-    mobile_count.columns = ["Mobile Number", "Count"]
-    mobile_count = mobile_count.sort_values(by="Count", ascending=False)
+    def update(self, df, dates=None):
+        """Add one chunk; dates is its date column already parsed (parsed here when None)."""
+        b_col = self.cols["b"]
+        address_col = self.cols["address"]
+        imei_col = self.cols["imei"]
+        self.rows += len(df)
 
-    # -------------------- Address (Optional) --------------------
-    possible_address_cols = ["Address", "Location", "Addr","SITE_ADDRESS","SiteLocation"] 
-    address_col = next((col for col in df.columns if col.strip().lower() in [c.lower() for c in possible_address_cols]), None)
+        # -------------------- Mobile Numbers --------------------
+        with self.perf.span("aggregate.mobile", rows=len(df)):
+            self.mobile_counts = self._add_counts(self.mobile_counts, value_counts(df[b_col]))
 
-    # -------------------- IMEI SHEET --------------------
-    possible_imei_cols = ["IMEI", "imei", "Imei number", "IMEI numbe"]
-    possible_date_cols = ["CALL_START_DT_TM", "Start Date", "Start Time", "Date" ,"STRT_TM" ,"Datetime"]
+        # -------------------- Addresses --------------------
+        if address_col:
+            with self.perf.span("aggregate.address", rows=len(df)):
+                self.address_counts = self._add_counts(self.address_counts, value_counts(df[address_col]))
+
+        # -------------------- IMEI --------------------
+        if imei_col:
+            with self.perf.span("aggregate.imei", rows=len(df)):
+                self._update_imei(df, dates)
 
-    imei_col = next((col for col in df.columns if col.strip().lower() in [c.lower() for c in possible_imei_cols]), None)
-    date_col = next((col for col in df.columns if col.strip().lower() in [c.lower() for c in possible_date_cols]), None)
+    def _update_imei(self, df, dates=None):
+        imei_col = self.cols["imei"]
+        date_col = self.cols["date"]
 
-    imei_summary = None
-    if imei_col:
         imei_df = df[[imei_col]].copy()
-        if date_col and date_col in df.columns:
-            imei_df["Date"] = pd.to_datetime(df[date_col], errors="coerce")
+        if date_col:
+            imei_df["Date"] = parse_dates(df[date_col]) if dates is None else dates
 
         imei_df = imei_df.dropna(subset=[imei_col])
-        imei_df[imei_col] = imei_df[imei_col].astype(str)
+        if not isinstance(imei_df[imei_col].dtype, pd.CategoricalDtype):
+            imei_df[imei_col] = imei_df[imei_col].astype(str)
+
+        # Categorical IMEIs are grouped by code, only the IMEIs present in this chunk
+        imei_group = imei_df.groupby(imei_col, observed=True)
+        stats = pd.DataFrame({"Count": imei_group.size()})
+        if date_col:
+            stats["Starting Date"] = imei_group["Date"].min()
+            stats["Ending Date"] = imei_group["Date"].max()
+        stats.index = stats.index.astype(str)
+
+        if self.imei_stats is None:
+            self.imei_stats = stats
+        else:
+            agg = {"Count": "sum"}
+            if date_col:
+                agg.update({"Starting Date": "min", "Ending Date": "max"})
+            self.imei_stats = pd.concat([self.imei_stats, stats]).groupby(level=0).agg(agg)
+
+    def mobile_sheet(self):
+        counts = self.mobile_counts if self.mobile_counts is not None else pd.Series(dtype="int64")
+        mobile_count = counts.reset_index()
+        mobile_count.columns = ["Mobile Number", "Count"]
+        return mobile_count.sort_values(by="Count", ascending=False)
+
+    def address_sheet(self):
+        if not self.cols["address"]:
+            return None
+        counts = self.address_counts if self.address_counts is not None else pd.Series(dtype="int64")
+        address_count = counts.reset_index()
+        address_count.columns = [self.cols["address"], "Count"]
+        return address_count.sort_values(by="Count", ascending=False)
+
+    def imei_sheet(self):
+        if not self.cols["imei"]:
+            return None
+        stats = self.imei_stats if self.imei_stats is not None else pd.DataFrame({"Count": pd.Series(dtype="int64")})
 
-        imei_group = imei_df.groupby(imei_col)
         imei_summary = pd.DataFrame({
-            "IMEI Number": imei_group.size().index,
-            "Count": imei_group.size().values
+            "IMEI Number": stats.index,
+            "Count": stats["Count"].values
         })
-
-        if date_col and "Date" in imei_df.columns:
-            imei_summary["Starting Date"] = imei_group["Date"].min().values
-            imei_summary["Ending Date"] = imei_group["Date"].max().values
+        if self.cols["date"]:
+            imei_summary["Starting Date"] = stats["Starting Date"].values
+            imei_summary["Ending Date"] = stats["Ending Date"].values
         else:
             imei_summary["Starting Date"] = None
             imei_summary["Ending Date"] = None
 
         imei_summary = imei_summary[["IMEI Number", "Starting Date", "Ending Date", "Count"]]
-        imei_summary = imei_summary.sort_values(by="Count", ascending=False)
-
-    # -------------------- Add space to numeric-only columns --------------------
-    df_formatted = df.copy()
-    for col in df_formatted.columns:
-        # Skip A/B columns (already formatted)
-        if col in [a_col, b_col]:
-            continue
-        # If column is numeric-only
-        if pd.to_numeric(df_formatted[col], errors="coerce").notna().all():
-            df_formatted[col] = df_formatted[col].apply(lambda x: f" {x}" if pd.notna(x) else x)
+        return imei_summary.sort_values(by="Count", ascending=False)
+
+
+def iter_csv_chunks(file_path, chunksize=CSV_CHUNK_ROWS, registry=layout_registry, roles_only=False):
+    """
+    Stream a CSV in chunks. Yields (cols, number_cols, date_format) first, then each
+    normalized chunk. Number/IMEI columns and the Excel text columns (typed
+    on the first chunk, see excel_text_columns) are read as text so their
+    values stay stable across chunks.
+    roles_only=True with a known layout reads only the role columns
+    (only the date column is sampled then, number_cols is empty).
+    """
+    header = pd.read_csv(file_path, nrows=0).columns
+    fingerprint = header_fingerprint(header, "csv")
+    layout = registry.get(fingerprint)
+    cols = layout_columns(header, fingerprint, kind="csv", registry=registry)
+
+    usecols = None
+    if roles_only and layout and layout.get("roles"):
+        usecols = [c for c in header if c in set(cols.values())]
+        number_cols = []
+        # Only the date column is sampled, to check the remembered format against this file
+        date_format = None
+        if cols["date"]:
+            sample = pd.read_csv(file_path, nrows=chunksize, usecols=[cols["date"]], dtype=str)
+            date_format = layout_date_format(sample[cols["date"]], fingerprint, registry)
+            del sample
+    else:
+        sample = pd.read_csv(file_path, nrows=chunksize, dtype=str)
+        number_cols = excel_text_columns(sample, [cols["a"], cols["b"]])
+        date_format = layout_date_format(sample[cols["date"]], fingerprint, registry) if cols["date"] else None
+        del sample
+
+    text_cols = {c: str for c in [cols["a"], cols["b"], cols["imei"], *number_cols] if c}
+    yield cols, number_cols, date_format
+
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, dtype=text_cols, usecols=usecols):
+        normalize_mobile_columns(chunk, [cols["a"], cols["b"]])
+        yield compact_frame(chunk)
+
+
+def analyze_excel(file_path, output_dir="temp_uploads", case_partition=False, stats=None, perf=None,
+                  formatted_data=True, data_format="xlsx"):
+    """
+    Enhanced Professional Excel Analyzer:
+    - Clean & normalize mobile numbers (03XXXXXXXXX or 92XXXXXXXXXX or +92XXXXXXXXXX)
+    - Add space before number columns (for Excel text format, added while writing;
+      in memory text columns stay categorical / Arrow strings)
+    - Keep only valid A/B numbers
+    - CSV files are streamed in chunks instead of being loaded whole
+    - The analyzed workbook is written to output_dir
+    - case_partition=True also writes the normalized rows to
+      output_dir/case_partition.parquet for utils.case_store.CaseStore
+    - stats (optional dict) receives the number of data rows processed
+    - perf (optional utils.perf.PerfRecorder) receives per-stage spans
+    - Header offset and column roles of known operator layouts come from
+      utils.layout_registry instead of being detected again
+    - formatted_data=False leaves out the Formatted Data; known layouts
+      are then read column-selectively (only the A/B/address/IMEI/date columns)
+    - The date format is inferred on a sample once per layout (utils.date_parser)
+      and the date column parsed with it
+    - data_format: "xlsx" writes Formatted Data as a sheet (split into numbered parts past
+      Excel's row limit); "parquet" / "csv" write it as output_dir/formatted_data.parquet
+      or .csv.gz instead (utils.bulk_writer), stats["data_path"] receives its path
+    """
+    perf = perf or NO_PERF
+
+    # -------------------- Read Excel / CSV --------------------
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext == ".csv":
+        chunks = iter_csv_chunks(file_path, roles_only=not formatted_data)
+        with perf.span("read_csv.sample"):
+            cols, number_cols, date_format = next(chunks)
+        chunks = perf.iter("read_csv.chunk", chunks)
+        text_cols = [c for c in [cols["a"], cols["b"], *number_cols] if c]
+    else:
+        df = read_excel_auto(file_path, perf=perf, roles_only=not formatted_data)
+        cols = layout_columns(df.columns, df.attrs["layout_fingerprint"], df.attrs["header_row"])
+        date_format = None
+        if cols["date"]:
+            with perf.span("date_format"):
+                date_format = layout_date_format(df[cols["date"]], df.attrs["layout_fingerprint"])
+
+        # Vectorized normalization; columns already normalized by read_excel_auto are skipped
+        with perf.span("normalize", rows=len(df)):
+            normalize_mobile_columns(df, [cols["a"], cols["b"]])
+        # Typed once by read_excel_auto, reused for every sheet
+        text_cols = list(df.attrs["excel_text_cols"])
+        chunks = [df]
+
+    totals = AnalysisTotals(cols, perf)
 
     # -------------------- Save analyzed Excel --------------------
-    output_dir = "temp_uploads"
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, "analyzed_excel_formatted.xlsx")
 
-    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-        mobile_count.to_excel(writer, sheet_name="Mobile Numbers", index=False)
-        if address_col:
-            address_df = df[[address_col]].dropna()
-            address_count = address_df[address_col].value_counts().reset_index()
-            address_count.columns = [address_col, "Count"]
-            address_count = address_count.sort_values(by="Count", ascending=False)
-            address_count.to_excel(writer, sheet_name="Addresses", index=False)
-        if imei_summary is not None:
-            imei_summary.to_excel(writer, sheet_name="IMEI Numbers", index=False)
-        df_formatted.to_excel(writer, sheet_name="Formatted Data", index=False)
-
-    # -------------------- Apply Professional Formatting --------------------
-    wb = load_workbook(output_path)
-    fill = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
-    bold_font = Font(bold=True)
-
-    for sheet in wb.sheetnames:
-        ws = wb[sheet]
-
-        # Header style
-        for cell in ws[1]:
-            cell.fill = fill
-            cell.font = bold_font
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # Center align all cells
-        for row in ws.iter_rows():
-            for cell in row:
-                cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-        # Auto width + Text format for IMEI / Mobile
-        for col in ws.columns:
-            max_length = 0
-            column = get_column_letter(col[0].column)
-            for cell in col:
-                if isinstance(cell.value, (int, float)) and sheet in ["Mobile Numbers", "IMEI Numbers"]:
-                    cell.number_format = "@"
-                try:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                except:
-                    pass
-            adjusted_width = (max_length + 4)
-            ws.column_dimensions[column].width = adjusted_width
-
-    wb.save(output_path)
+    sheet_names = ["Mobile Numbers"]
+    if cols["address"]:
+        sheet_names.append("Addresses")
+    if cols["imei"]:
+        sheet_names.append("IMEI Numbers")
+    bulk_writer = None
+    if formatted_data and data_format == "xlsx":
+        sheet_names.append("Formatted Data")
+    elif formatted_data:
+        data_path = os.path.join(output_dir, "formatted_data" + BULK_FORMATS.get(data_format, ""))
+        bulk_writer = BulkDataWriter(data_path, data_format)
+
+    partition_writer = None
+    if case_partition:
+        partition_writer = CasePartitionWriter(os.path.join(output_dir, CASE_PARTITION_NAME), cols)
+
+    # Rows are styled while they are streamed out (no load_workbook pass)
+    writer = StyledExcelWriter(output_path, sheet_names)
+    try:
+        # Formatted Data is written chunk by chunk while the totals are counted
+        for chunk in chunks:
+            # Dates are parsed once per chunk (explicit format, fallback only for the rest)
+            dates = None
+            if cols["date"]:
+                with perf.span("parse_dates", rows=len(chunk)):
+                    dates = parse_dates(chunk[cols["date"]], date_format)
+            totals.update(chunk, dates)
+            if partition_writer:
+                with perf.span("case_partition", rows=len(chunk)):
+                    partition_writer.write(chunk, dates)
+            if bulk_writer:
+                with perf.span(f"write.formatted_data.{data_format}", rows=len(chunk)):
+                    bulk_writer.write(chunk)
+            elif formatted_data:
+                # Numbers get their Excel-safe leading space only here, while they are written
+                with perf.span("write.formatted_data", rows=len(chunk)):
+                    writer.write_frame("Formatted Data", chunk, text_cols=text_cols)
+
+        with perf.span("write.summary_sheets"):
+            writer.write_frame("Mobile Numbers", totals.mobile_sheet(), text_cols=["Mobile Number"])
+            if cols["address"]:
+                address_text = [cols["address"]] if cols["address"] in text_cols else []
+                writer.write_frame("Addresses", totals.address_sheet(), text_cols=address_text)
+            if cols["imei"]:
+                writer.write_frame("IMEI Numbers", totals.imei_sheet(), text_cols=["IMEI Number"])
+    finally:
+        with perf.span("write.close"):
+            writer.close()
+            if bulk_writer:
+                bulk_writer.close()
+
+    if partition_writer:
+        partition_writer.close()
+    if stats is not None:
+        stats["rows"] = totals.rows
+        if bulk_writer:
+            stats["data_path"] = bulk_writer.path
+
     return output_path
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import zipfile
+from utils.session_cache import result_cache
+
+# Job functions of the Streamlit pages, run by utils.job_queue.job_queue.
+# They report through the job (log / add_item / update) instead of calling st.*,
+# and return the paths the page offers for download.
+# Heavy dependencies are imported inside each job, so importing this module
+# (every page of the app does) stays cheap.
+
+
+class FileMessage:
+    """Saved uploads in the message format handle_files() expects (elements with a .path)."""
+
+    def __init__(self, paths):
+        self.elements = [type("Element", (), {"path": path})() for path in paths]
+
+
+def unique_name(name, used):
+    """name, or "stem (n).ext" when it is in used already (same file name uploaded twice)."""
+    stem, ext = os.path.splitext(name)
+    unique, number = name, 2
+    while unique.lower() in used:
+        unique, number = f"{stem} ({number}){ext}", number + 1
+    used.add(unique.lower())
+    return unique
+
+
+def extract_job(job, workdir, file_paths, extract_key, pages_per_request=1):
+    """
+    Application Extractor: pages -> Gemini -> fields -> Excel.
+    Every page result is journaled and added to the job as it finishes;
+    pages of an earlier interrupted run of the same upload are skipped.
+    Returns {"results", "excel_path", "perf", "exported"} (exported: the spans were
+    sent as an OpenTelemetry trace, see utils.perf.PerfRecorder.export_otel).
+    """
+    from multi_file_handler import handle_files
+    from utils.excel_writer import save_to_excel
+    from utils.extraction_journal import ExtractionJournal
+    from utils.gemini_extractor import iter_extractions, get_model
+    from utils.pdf_rasterizer import rasterize_files
+    from utils.perf import PerfRecorder
+
+    perf = PerfRecorder()
+    journal = ExtractionJournal(extract_key)
+    done = journal.load()
+    if done:
+        job.log("success", f"♻️ Resuming: {len(done)} page(s) already extracted in an earlier run.")
+        for result in sorted(done.values(), key=lambda r: r["index"]):
+            job.add_item(result)
+
+    # Handle files, then render PDF pages / re-encode images in a process pool
+    job.update(message="🔍 Reading pages ...")
+    with perf.span("handle_files") as span:
+        file_data = asyncio.run(handle_files(FileMessage(file_paths)))
+        span["rows"] = len(file_data)
+    page_count = len(file_data)
+    for index, file in enumerate(file_data):
+        file["index"] = index
+    file_data = [file for file in file_data if file["index"] not in done]
+    job.check_cancelled()
+    with perf.span("pdf_render", rows=len(file_data)):
+        file_data = rasterize_files(file_data)
+    failed = False
+    for file in file_data:
+        if "error" in file:
+            failed = True
+            job.log("error", f"❌ {file['file_name']}: {file['error']}")
+    file_data = [file for file in file_data if "error" not in file]
+    job.check_cancelled()
+
+    # One model for every job of the process (configured on first use, requests use its blocking client)
+    model = get_model()
+    finished = len(done)
+    job.update(progress=finished / max(page_count, 1), message=f"🔍 {finished}/{page_count} page(s) extracted")
+
+    def show_wait(wait_time):
+        job.update(message=f"⏳ Rate limit reached! Waiting {int(wait_time)}s before next request...")
+
+    async def run_extraction():
+        nonlocal finished
+        # Up to MAX_CONCURRENT_REQUESTS Gemini calls in flight, results reported as they finish
+        results = iter_extractions(file_data, model, on_wait=show_wait, perf=perf, pages_per_request=pages_per_request)
+        try:
+            async for result in results:
+                if "error" in result:
+                    job.log("error", f"❌ Gemini Vision error ({result['file_name']}): {result['error']}")
+                else:
+                    journal.append(result)
+                    job.add_item(result)
+                    finished += 1
+                job.update(progress=finished / page_count, message=f"🔍 {finished}/{page_count} page(s) extracted")
+                if job.cancelled:
+                    # Requests still in flight are cancelled, journaled pages are kept for a resume
+                    break
+        finally:
+            await results.aclose()
+
+    with perf.span("extraction", rows=len(file_data)):
+        asyncio.run(run_extraction())
+    job.check_cancelled()
+
+    # All journaled pages (this run + earlier ones), in upload order
+    results = journal.results()
+
+    # Only complete runs are memoized, so failed pages are retried next time
+    if not failed and len(results) == page_count:
+        result_cache.put_json(extract_key, results)
+        journal.remove()
+
+    # Save to Excel (inside the session's work directory) in one streaming write
+    excel_path = save_to_excel((r["fields"] for r in results), workdir.file(f"extracted_data-{job.id}.xlsx"))
+    # Exported once per run here, the page only shows the spans
+    exported = perf.export_otel("Application Extractor")
+    return {"results": results, "excel_path": excel_path, "perf": perf, "exported": exported}
+
+
+def analyze_job(job, workdir, pending, cached=(), case_id="", data_format="xlsx"):
+    """
+    Excel Analyzer: analyze the saved uploads in parallel and ZIP the results.
+    pending: {saved_path: (file_name, file_key, cache_key)} files to analyze
+    cached: [(file_name, analyzed_path, data_path)] results taken from the result cache
+    data_format: "xlsx" (Formatted Data sheet) or a bulk format of utils.bulk_writer,
+    whose file is zipped next to the workbook.
+    Returns {"zip_path", "perf", "exported"}.
+    """
+    from utils.bulk_writer import BULK_FORMATS
+    from utils.case_store import CaseStore
+    from utils.parallel_analyzer import iter_analyses, partition_path
+    from utils.perf import PerfRecorder
+
+    perf = PerfRecorder()
+    case_store = CaseStore(case_id) if case_id else None
+    data_ext = BULK_FORMATS.get(data_format)
+
+    # ZIP is written to disk as results come in (not held in memory)
+    zip_path = workdir.file(f"Analyzed_Files-{job.id}.zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        used = set()
+
+        def add_to_zip(name, analyzed_path, data_path):
+            name = unique_name(name, used)
+            zipf.write(analyzed_path, arcname="(Analyzed)-" + name)
+            if data_path:
+                # Parquet / gzip are compressed already
+                zipf.write(data_path, arcname=f"(Data)-{os.path.splitext(name)[0]}{data_ext}",
+                           compress_type=zipfile.ZIP_STORED)
+
+        for name, analyzed_path, data_path in cached:
+            add_to_zip(name, analyzed_path, data_path)
+
+        if pending:
+            # All remaining files are analyzed in parallel (one process per file)
+            job.update(message=f"⏳ Processing {len(pending)} file(s) ...")
+            results = iter_analyses(
+                list(pending), os.path.join(workdir.path, "analyzed", job.id), case_partition=case_store is not None,
+                data_format=data_format,
+            )
+            try:
+                for done, result in enumerate(results, start=1):
+                    name, file_key, cache_key = pending[result["file_path"]]
+                    analyzed_path = result["analyzed_path"]
+                    data_path = result["data_path"]
+                    perf.merge(result["spans"])
+                    if result["error"]:
+                        job.log("error", f"❌ Error in {name}: {result['error']}")
+                    else:
+                        if case_store is not None:
+                            with perf.span("case_store.add_partition"):
+                                case_store.add_partition(file_key, name, partition_path(analyzed_path))
+                        if data_path:
+                            data_path = result_cache.put_file(cache_key, data_path, ext=data_ext)
+                        analyzed_path = result_cache.put_file(cache_key, analyzed_path)
+                        add_to_zip(name, analyzed_path, data_path)
+                        job.log("success", f"✅ {name} analyzed successfully!")
+                    job.update(progress=done / len(pending), message=f"⏳ {done}/{len(pending)} file(s) processed")
+                    # Files not started yet are dropped when the generator is closed
+                    job.check_cancelled()
+            finally:
+                results.close()
+    exported = perf.export_otel("Excel Analyzer")
+    return {"zip_path": zip_path, "perf": perf, "exported": exported}
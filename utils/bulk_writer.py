@@ -0,0 +1,108 @@
+import gzip
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Bulk output formats for the Formatted Data (file suffix per format)
+BULK_FORMATS = {"parquet": ".parquet", "csv": ".csv.gz"}
+
+# gzip level of the CSV output (9 is much slower for little gain)
+CSV_GZIP_LEVEL = 6
+
+
+def _arrow_frame(df):
+    """Frame Arrow can convert: mixed-type object columns become text."""
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True).startswith("mixed"):
+            df[col] = series.astype(str).where(series.notna())
+    return df
+
+
+def _plain_schema(schema):
+    """Schema with dictionary (categorical) columns stored as their value type."""
+    return pa.schema([
+        pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type) else field
+        for field in schema
+    ])
+
+
+def _widened_schema(schema, table):
+    """schema with the columns whose table values do not cast to it changed to text."""
+    fields = []
+    for field in schema:
+        try:
+            table.column(field.name).cast(field.type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            field = pa.field(field.name, pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+class BulkDataWriter:
+    """
+    All normalized rows of one file as a single bulk file, written chunk by chunk:
+    - parquet: Arrow schema of the first chunk (categoricals stored as plain text);
+      a column a later chunk does not fit (e.g. empty in the first chunk, text later)
+      becomes text, and the rows written so far are copied into the widened file
+    - csv    : gzip-compressed CSV with a header line
+    Much faster to write than an xlsx sheet and without Excel's row limit.
+    Values are written as they are: the Excel-safe leading space is an xlsx-only fix.
+    """
+
+    def __init__(self, path, fmt):
+        if fmt not in BULK_FORMATS:
+            raise ValueError(f"Unknown bulk format {fmt!r} (expected one of {', '.join(BULK_FORMATS)})")
+        self.path = path
+        self.fmt = fmt
+        self.schema = None
+        self.writer = None
+        self.writer_path = None
+        self.file = None
+
+    def write(self, df):
+        if self.fmt == "parquet":
+            table = pa.Table.from_pandas(_arrow_frame(df.copy(deep=False)), preserve_index=False)
+            if self.writer is None:
+                self.schema = _plain_schema(table.schema).remove_metadata()
+                self.writer_path = self.path
+                self.writer = pq.ParquetWriter(self.writer_path, self.schema)
+            # Later chunks are cast to the first chunk's schema (e.g. int -> float for missing values)
+            try:
+                table = table.cast(self.schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                self._widen(_widened_schema(self.schema, table))
+                table = table.cast(self.schema)
+            self.writer.write_table(table)
+        else:
+            header = self.file is None
+            if header:
+                self.file = gzip.open(self.path, "wt", encoding="utf-8", newline="", compresslevel=CSV_GZIP_LEVEL)
+            df.to_csv(self.file, index=False, header=header)
+
+    def _widen(self, schema):
+        """Continue in a new file with the given schema, starting with the rows written so far."""
+        self.writer.close()
+        written = self.writer_path
+        # Alternates between the final path and a temporary one next to it
+        self.writer_path = f"{self.path}.tmp" if written == self.path else self.path
+        self.writer = pq.ParquetWriter(self.writer_path, schema)
+        for batch in pq.ParquetFile(written).iter_batches():
+            self.writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+        os.remove(written)
+        self.schema = schema
+
+    def close(self):
+        """Finish the file (an empty one when no chunk was written) and return its path."""
+        if self.fmt == "parquet":
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, pa.schema([]))
+            self.writer.close()
+            if self.writer_path not in (None, self.path):
+                os.replace(self.writer_path, self.path)
+        else:
+            if self.file is None:
+                self.file = gzip.open(self.path, "wt", encoding="utf-8", newline="", compresslevel=CSV_GZIP_LEVEL)
+            self.file.close()
+        return self.path
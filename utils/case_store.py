@@ -0,0 +1,181 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.styled_writer import StyledExcelWriter
+from utils.date_parser import parse_dates
+
+CASES_DIR = "cases"
+
+# File name of the per-file partition written next to the analyzed workbook
+CASE_PARTITION_NAME = "case_partition.parquet"
+
+# Canonical columns stored for every file, whatever the operator layout
+PARTITION_SCHEMA = pa.schema([
+    ("a_number", pa.string()),
+    ("b_number", pa.string()),
+    ("imei", pa.string()),
+    ("address", pa.string()),
+    ("date", pa.timestamp("ns")),
+])
+
+_case_locks = {}
+_case_locks_guard = threading.Lock()
+
+
+def _text(series):
+    """Values as stripped text (Excel-safe leading space removed), missing stays missing."""
+    return series.astype(str).str.strip().where(series.notna())
+
+
+def case_frame(df, cols, dates=None):
+    """
+    Canonical frame (PARTITION_SCHEMA columns) for one normalized chunk.
+    dates: the date column already parsed (utils.date_parser.parse_dates), parsed here when None.
+    """
+    empty = pd.Series(None, index=df.index, dtype=object)
+    frame = pd.DataFrame({
+        "a_number": _text(df[cols["a"]]) if cols["a"] else empty,
+        "b_number": _text(df[cols["b"]]),
+        "imei": _text(df[cols["imei"]]) if cols["imei"] else empty,
+        "address": _text(df[cols["address"]]) if cols["address"] else empty,
+        "date": (parse_dates(df[cols["date"]]) if dates is None else dates) if cols["date"] else pd.NaT,
+    })
+    return frame
+
+
+class CasePartitionWriter:
+    """
+    Writes the canonical rows of one file to a Parquet partition, chunk by chunk.
+    """
+
+    def __init__(self, path, cols):
+        self.path = path
+        self.cols = cols
+        self.writer = pq.ParquetWriter(path, PARTITION_SCHEMA)
+
+    def write(self, df, dates=None):
+        table = pa.Table.from_pandas(case_frame(df, self.cols, dates), schema=PARTITION_SCHEMA, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+
+def _merge(old, new, key, agg):
+    if old is None or old.empty:
+        return new
+    return pd.concat([old, new]).groupby(key, as_index=False).agg(agg)
+
+
+class CaseStore:
+    """
+    Per-case store of normalized CDR rows:
+    - parts/<file_key>.parquet : one partition per analyzed file
+    - manifest.json            : which files are in the case
+    - mobile/imei/address.parquet : consolidated counts, updated incrementally
+    Adding a file only reads that file's partition, never the earlier ones.
+    """
+
+    def __init__(self, case_id, root=CASES_DIR):
+        self.case_id = case_id
+        self.path = os.path.join(root, re.sub(r"[^\w\-]+", "_", case_id).strip("_") or "case")
+        self.parts_dir = os.path.join(self.path, "parts")
+        self.manifest_path = os.path.join(self.path, "manifest.json")
+        with _case_locks_guard:
+            self.lock = _case_locks.setdefault(self.path, threading.Lock())
+
+    def manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {"case_id": self.case_id, "files": {}}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def __contains__(self, file_key):
+        return file_key in self.manifest()["files"]
+
+    def _totals_path(self, name):
+        return os.path.join(self.path, f"{name}.parquet")
+
+    def _read_totals(self, name):
+        path = self._totals_path(name)
+        return pd.read_parquet(path) if os.path.exists(path) else None
+
+    def _write_totals(self, name, df):
+        path = self._totals_path(name)
+        df.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+
+    def add_partition(self, file_key, file_name, partition_path):
+        """
+        Move a partition written by analyze_excel into the case and update the totals.
+        Returns False when the file is already part of the case.
+        """
+        with self.lock:
+            manifest = self.manifest()
+            if file_key in manifest["files"]:
+                return False
+
+            os.makedirs(self.parts_dir, exist_ok=True)
+            part_path = os.path.join(self.parts_dir, f"{file_key}.parquet")
+            shutil.copyfile(partition_path, part_path)
+            part = pd.read_parquet(part_path)
+
+            # -------------------- Per-file counts --------------------
+            mobile = part["b_number"].dropna().value_counts().rename_axis("Mobile Number").reset_index(name="Count")
+            mobile["Files"] = 1
+            address = part["address"].dropna().value_counts().rename_axis("Address").reset_index(name="Count")
+            address["Files"] = 1
+            imei_group = part.dropna(subset=["imei"]).groupby("imei")
+            imei = pd.DataFrame({
+                "Count": imei_group.size(),
+                "Starting Date": imei_group["date"].min(),
+                "Ending Date": imei_group["date"].max(),
+            }).rename_axis("IMEI Number").reset_index()
+            imei["Files"] = 1
+
+            # -------------------- Merge into case totals --------------------
+            counts = {"Count": "sum", "Files": "sum"}
+            self._write_totals("mobile", _merge(self._read_totals("mobile"), mobile, "Mobile Number", counts))
+            self._write_totals("address", _merge(self._read_totals("address"), address, "Address", counts))
+            self._write_totals("imei", _merge(
+                self._read_totals("imei"), imei, "IMEI Number",
+                {**counts, "Starting Date": "min", "Ending Date": "max"}
+            ))
+
+            manifest["files"][file_key] = {
+                "name": file_name,
+                "rows": len(part),
+                "partition": os.path.relpath(part_path, self.path),
+                "added": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            with open(self.manifest_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(self.manifest_path + ".tmp", self.manifest_path)
+            return True
+
+    def consolidated(self):
+        """
+        Case-wide sheets sorted by Count: {"Mobile Numbers", "IMEI Numbers", "Addresses"}.
+        """
+        sheets = {}
+        for name, sheet in (("mobile", "Mobile Numbers"), ("imei", "IMEI Numbers"), ("address", "Addresses")):
+            df = self._read_totals(name)
+            if df is not None:
+                sheets[sheet] = df.sort_values(by=["Files", "Count"], ascending=False).reset_index(drop=True)
+        return sheets
+
+    def export_excel(self, output_path):
+        """
+        Styled workbook of the consolidated counts (numbers keep the Excel-safe space).
+        """
+        sheets = self.consolidated()
+        with StyledExcelWriter(output_path, list(sheets)) as writer:
+            for sheet, df in sheets.items():
+                writer.write_frame(sheet, df, text_cols=["Mobile Number", "IMEI Number"])
+        return output_path
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from utils.mobile_normalizer import STRING_DTYPE, EXCEL_TEXT_PREFIX
+
+# Text columns with at most this share of distinct values become categoricals
+# (A number, call type, cell-site address, IMEI ...), the rest Arrow strings
+CATEGORY_MAX_RATIO = 0.5
+
+# Columns with more than this share of digit-only values are written as Excel text
+DIGIT_TEXT_RATIO = 0.8
+
+# Rows looked at by excel_text_columns() before a column is checked in full
+TYPE_SAMPLE_ROWS = 1000
+
+
+def compact_series(series):
+    """
+    Pure text column -> category (repetitive) or Arrow string (mostly unique).
+    Columns holding anything other than strings (numbers, dates, mixed) are returned as is,
+    so the values written to Excel keep their type.
+    """
+    if series.dtype != object:
+        return series
+    if pd.api.types.infer_dtype(series, skipna=True) not in ("string", "empty"):
+        return series
+    if series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(series):
+        return series.astype("category")
+    return series.astype(STRING_DTYPE)
+
+
+def compact_frame(df, skip=()):
+    """Compact every text column of df in place (columns in skip are left alone)."""
+    for col in df.columns:
+        if col not in skip:
+            df[col] = compact_series(df[col])
+    return df
+
+
+def value_counts(series):
+    """
+    value_counts() without the zero counts a categorical reports for unseen
+    categories, indexed by plain values so chunk results can be added up.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.dropna().value_counts()
+    # Counted on the integer codes: same order as counting the values themselves
+    codes = series.cat.codes
+    counts = codes[codes >= 0].value_counts()
+    counts.index = pd.Index(series.cat.categories.take(counts.index).astype(object), name=series.name)
+    return counts
+
+
+def is_numeric_only(series):
+    """True when every value of the column is numeric (categoricals are checked on their categories)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return bool(series.notna().all()) and bool(pd.to_numeric(series.cat.categories, errors="coerce").notna().all())
+    return bool(pd.to_numeric(series, errors="coerce").notna().all())
+
+
+def digit_ratio(series):
+    """Share of the non-missing values that are digit strings (integers >= 0 count as digits)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes
+        codes = codes[codes >= 0]
+        if codes.empty:
+            return 0.0
+        digits = np.asarray(series.cat.categories.astype(str).str.fullmatch(r"\d+"), dtype=bool)
+        return float(digits.take(codes.to_numpy()).mean())
+    values = series.dropna()
+    if values.empty or pd.api.types.is_bool_dtype(values):
+        return 0.0
+    if pd.api.types.is_integer_dtype(values):
+        return float((values >= 0).mean())
+    if pd.api.types.is_float_dtype(values):
+        return 0.0
+    return float(values.astype(str).str.fullmatch(r"\d+").mean())
+
+
+def is_excel_text(series):
+    """Numbers Excel would mangle: mostly digit strings (IMEI, numbers, IDs) or numeric only."""
+    return digit_ratio(series) > DIGIT_TEXT_RATIO or is_numeric_only(series)
+
+
+def excel_text_columns(df, skip=(), sample_rows=TYPE_SAMPLE_ROWS):
+    """
+    One typing pass over df: the columns to write as Excel text (see is_excel_text).
+    Every column is classified on a sample of rows spread over the frame; only the
+    candidates are confirmed on the whole column.
+    """
+    step = max(1, len(df) // sample_rows)
+    sample = df.iloc[::step].head(sample_rows)
+    return [
+        col for col in df.columns
+        if col not in skip and is_excel_text(sample[col]) and is_excel_text(df[col])
+    ]
+
+
+def excel_text(series):
+    """
+    Values with the Excel-safe leading space (kept as text by Excel), missing stays missing.
+    Only used while writing; categoricals just get their categories renamed.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.rename_categories(lambda value: f"{EXCEL_TEXT_PREFIX}{value}")
+    return (EXCEL_TEXT_PREFIX + series.astype(STRING_DTYPE)).astype(object)
+
+
+def excel_safe_frame(df, text_cols=None):
+    """
+    Copy of df with the Excel-safe prefix applied to its text columns
+    (default: df.attrs["excel_text_cols"]), e.g. before df.to_excel().
+    """
+    text_cols = df.attrs.get("excel_text_cols", []) if text_cols is None else text_cols
+    out = df.copy()
+    for col in text_cols:
+        if col in out.columns:
+            out[col] = excel_text(out[col])
+    return out
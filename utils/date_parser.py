@@ -0,0 +1,130 @@
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Date formats of the operator exports, tried in this order on a sample of the column
+# (day-first before month-first: both match days <= 12, only the right one matches the rest)
+DATE_FORMATS = [
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%d-%m-%Y %H:%M:%S",
+    "%d-%m-%Y",
+    "%d.%m.%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%d-%b-%Y %I:%M:%S %p",
+    "%d-%b-%Y %H:%M:%S",
+    "%d-%b-%y %I.%M.%S %p",
+    "%m/%d/%Y %I:%M:%S %p",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y",
+    "%Y%m%d%H%M%S",
+    "ISO8601",
+]
+
+# Values looked at to pick the format, and the share of them it has to parse
+SAMPLE_ROWS = 500
+MIN_MATCH_RATIO = 0.9
+
+
+def _as_text(series):
+    """Date values as strings; numbers (e.g. 20250701123000) without a decimal part."""
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if (values % 1 == 0).all():
+            return values.astype("int64").astype(str).reindex(series.index)
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(str).where(series.notna())
+    return series
+
+
+def _sample(series, rows):
+    """Up to `rows` non-missing values spread over the whole column."""
+    values = series.dropna()
+    step = max(1, len(values) // rows)
+    return values.iloc[::step].head(rows)
+
+
+def _text_sample(series, sample_rows):
+    """Sample of a date column as text, None when it already holds dates or is not text."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = pd.Series(series.cat.categories)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return None
+    sample = _sample(_as_text(series), sample_rows)
+    if sample.empty or pd.api.types.infer_dtype(sample, skipna=True) != "string":
+        return None
+    return sample
+
+
+def _match_ratio(sample, fmt):
+    return pd.to_datetime(sample, format=fmt, errors="coerce").notna().mean()
+
+
+def _is_dayfirst(fmt):
+    """True for formats with the day before the month (13/01/2025, 13-Jan-2025)."""
+    day = fmt.find("%d")
+    month = min((i for i in (fmt.find("%m"), fmt.find("%b"), fmt.find("%B")) if i >= 0), default=-1)
+    return 0 <= day < month
+
+
+def date_format_fits(series, fmt, sample_rows=SAMPLE_ROWS):
+    """
+    True when fmt parses at least MIN_MATCH_RATIO of a sample of the column
+    (e.g. a format remembered from an earlier file of the same layout).
+    Columns that already hold dates (or no text) fit any format.
+    """
+    sample = _text_sample(series, sample_rows)
+    return sample is None or _match_ratio(sample, fmt) >= MIN_MATCH_RATIO
+
+
+def infer_date_format(series, sample_rows=SAMPLE_ROWS):
+    """
+    Format parsing the most values of a sample of a text (or numeric) date column:
+    one of DATE_FORMATS, else the format pandas guesses from the first value.
+    None when the column already holds dates or no format parses MIN_MATCH_RATIO of the sample.
+    """
+    sample = _text_sample(series, sample_rows)
+    if sample is None:
+        return None
+
+    best, best_ratio = None, 0.0
+    for fmt in DATE_FORMATS:
+        ratio = _match_ratio(sample, fmt)
+        if ratio > best_ratio:
+            best, best_ratio = fmt, ratio
+        if ratio == 1.0:
+            return fmt
+
+    # None of the known formats fits every value: also try the one pandas guesses
+    guessed = guess_datetime_format(sample.iloc[0], dayfirst=True)
+    if guessed and guessed not in DATE_FORMATS:
+        ratio = _match_ratio(sample, guessed)
+        if ratio > best_ratio:
+            best, best_ratio = guessed, ratio
+    return best if best_ratio >= MIN_MATCH_RATIO else None
+
+
+def parse_dates(series, fmt=None):
+    """
+    pd.to_datetime(series, errors="coerce"), but vectorized with an explicit format:
+    only the values fmt does not parse (all of them when fmt is None) go through
+    the general element-wise parser, day first when fmt is. Categoricals are
+    parsed once per category.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = parse_dates(pd.Series(series.cat.categories), fmt).to_numpy()
+        codes = series.cat.codes.to_numpy()
+        values = categories.take(codes)
+        values[codes < 0] = None
+        return pd.Series(values, index=series.index, name=series.name, dtype="datetime64[ns]")
+    if fmt is None or pd.api.types.is_datetime64_any_dtype(series):
+        return pd.to_datetime(series, errors="coerce")
+
+    parsed = pd.to_datetime(_as_text(series), format=fmt, errors="coerce")
+    rest = parsed.isna() & series.notna()
+    if rest.any():
+        parsed[rest] = pd.to_datetime(series[rest], errors="coerce", format="mixed", dayfirst=_is_dayfirst(fmt))
+    return parsed
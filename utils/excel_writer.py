@@ -1,16 +1,32 @@
+import itertools
 import pandas as pd
+from utils.styled_writer import StyledExcelWriter
 
-def save_to_excel(all_data):
+# Records per frame handed to the writer
+WRITE_CHUNK_ROWS = 1000
+
+
+def save_to_excel(all_data, excel_path="extracted_data.xlsx"):
     """
-    Save a list of dictionaries to Excel
+    Save dictionaries to Excel in one streaming write.
+    all_data can be a list or any iterable (e.g. ExtractionJournal.fields()),
+    it is written chunk by chunk and never held as one frame.
     """
-    # Ensure list of dicts
-    df = pd.DataFrame(all_data)
-    
-    # Optional: clean IMEI column
-    if "IMEI Number" in df.columns:
-        df["IMEI Number"] = df["IMEI Number"].astype(str).str.strip()
-    
-    excel_path = "extracted_data.xlsx"
-    df.to_excel(excel_path, index=False)
+    all_data = iter(all_data)
+    columns = None
+    with StyledExcelWriter(excel_path, ["Sheet1"]) as writer:
+        while True:
+            chunk = list(itertools.islice(all_data, WRITE_CHUNK_ROWS))
+            if not chunk:
+                break
+            df = pd.DataFrame(chunk)
+            # Columns of the first chunk fix the layout of the sheet
+            columns = list(df.columns) if columns is None else columns
+            df = df.reindex(columns=columns)
+
+            # Optional: clean IMEI column
+            if "IMEI Number" in df.columns:
+                df["IMEI Number"] = df["IMEI Number"].astype(str).str.strip()
+
+            writer.write_frame("Sheet1", df)
     return excel_path
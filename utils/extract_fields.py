@@ -1,64 +1,95 @@
 import re
 
+# Fields of one application, in Excel column order
+FIELD_NAMES = [
+    "Name",
+    "Phone Number",
+    "Police Station",
+    "Other Property",
+    "Mobile Model",
+    "Type",
+    "Date Of Offence",
+    "Time Of Offence",
+    "IMEI Number",
+    "last Num Used",
+]
+
+# Line patterns, compiled once (checked in this order, first match wins)
+NAME_RE = re.compile(r"(?i).*name[:：]")
+POLICE_STATION_RE = re.compile(r"(?i).*Police Station[:：]")
+OTHER_PROPERTY_RE = re.compile(r"(?i).*Other Property[:：]")
+LAST_NUM_RE = re.compile(r"(?i).*last Num Used[:：]")
+MOBILE_MODEL_RE = re.compile(r"(?i).*mobile model[:：]")
+IMEI_LINE_RE = re.compile(r"(?i).*imei number[:：]")
+PHONE_RE = re.compile(r"(?i).*(phone|contact) number[:：]")
+DATE_RE = re.compile(r"(?i).*Date Of Offence[:：]")
+TIME_LINE_RE = re.compile(r"(?i).*Time Of Offence[:：]")
+TYPE_RE = re.compile(r"(?i).*type[:：]")
+
+IMEI_RE = re.compile(r"\b\d{14,17}\b")
+TIME_RE = re.compile(r"(?i)Time Of Offence[:：]?\s*(\d{1,2}:\d{2}(?:\s?[APMapm]{2})?)")
+TIME_VALUE_RE = re.compile(r"\d{1,2}:\d{2}(?:\s?[APMapm]{2})?")
+
 def extract_fields_from_text(text):
-    fields = {
-        "Name": "",
-        "Phone Number": "",
-        "Police Station": "",
-        "Other Property":"",
-        "Mobile Model": "",
-        "Type": "",
-        "Date Of Offence": "",
-        "Time Of Offence": "",
-        "IMEI Number": "",
-        "last Num Used": "",
-        
-        
-        
-        
-        
-    }
-    
-    
+    fields = dict.fromkeys(FIELD_NAMES, "")
+
     lines = text.splitlines()
 
     for line in lines:
         line = line.strip()
-        
-        if re.match(r"(?i).*name[:：]", line):
+
+        if NAME_RE.match(line):
             fields["Name"] = line.split(":", 1)[-1].strip()
 
-        elif re.match(r"(?i).*Police Station[:：]", line):
+        elif POLICE_STATION_RE.match(line):
             fields["Police Station"] = line.split(":", 1)[-1].strip()
-        
-        elif re.match(r"(?i).*Other Property[:：]", line):
+
+        elif OTHER_PROPERTY_RE.match(line):
             fields["Other Property"] = line.split(":", 1)[-1].strip()
 
-        elif re.match(r"(?i).*last Num Used[:：]",line):
+        elif LAST_NUM_RE.match(line):
             fields["last Num Used"] = line.split(":" , 1)[-1].strip()
 
-        elif re.match(r"(?i).*mobile model[:：]", line):
+        elif MOBILE_MODEL_RE.match(line):
             fields["Mobile Model"] = line.split(":", 1)[-1].strip()
 
         # ✅ Updated IMEI logic: multiple IMEIs, single space, no Excel E+14 issue
-        elif re.match(r"(?i).*imei number[:：]", line):
-            imeis = re.findall(r"\b\d{14,17}\b", line)
+        elif IMEI_LINE_RE.match(line):
+            imeis = IMEI_RE.findall(line)
             if imeis:
                 safe_imeis = [f"{imei}" for imei in imeis]  # Prepend ' to stop Excel from converting
                 fields["IMEI Number"] = " ".join(safe_imeis)
 
-        elif re.match(r"(?i).*(phone|contact) number[:：]", line):
+        elif PHONE_RE.match(line):
             fields["Phone Number"] = line.split(":", 1)[-1].strip()
 
-        elif re.match(r"(?i).*Date Of Offence[:：]", line):
+        elif DATE_RE.match(line):
             fields["Date Of Offence"] = line.split(":", 1)[-1].strip()
 
-        elif re.match(r"(?i).*Time Of Offence[:：]", line):
-            match = re.search(r"(?i)Time Of Offence[:：]?\s*(\d{1,2}:\d{2}(?:\s?[APMapm]{2})?)", line)
+        elif TIME_LINE_RE.match(line):
+            match = TIME_RE.search(line)
             if match:
                 fields["Time Of Offence"] = match.group(1).strip()
 
-        elif re.match(r"(?i).*type[:：]", line):
+        elif TYPE_RE.match(line):
             fields["Type"] = line.split(":", 1)[-1].strip()
 
     return fields
+
+
+def clean_fields(record):
+    """
+    Fields from a structured (JSON) reply, cleaned the same way as the text parser:
+    every field present as a stripped string, IMEIs as 14-17 digit numbers joined
+    by single spaces, time as HH:MM [AM/PM].
+    """
+    fields = {name: str(record.get(name) or "").strip() for name in FIELD_NAMES}
+    fields["IMEI Number"] = " ".join(IMEI_RE.findall(fields["IMEI Number"]))
+    match = TIME_VALUE_RE.search(fields["Time Of Offence"])
+    fields["Time Of Offence"] = match.group(0).strip() if match else ""
+    return fields
+
+
+def fields_to_text(fields):
+    """Plain-text reply for the fields ("Name: ..." per line), as the single-page prompt returns it."""
+    return "\n".join(f"{name}: {fields.get(name, '')}" for name in FIELD_NAMES)
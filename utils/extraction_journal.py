@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+import time
+
+JOURNALS_DIR = os.path.join(".cache", "journals")
+MAX_AGE_DAYS = 7
+
+
+class ExtractionJournal:
+    """
+    Append-only JSON-lines journal of one extraction batch (keyed by the upload hash).
+    Every page result is written as soon as it is parsed, so a crash, rerun or quota
+    error only loses the pages still in flight; a rerun of the same batch skips
+    the pages already journaled. A torn last line (crash mid-write) is ignored.
+    """
+
+    def __init__(self, key, directory=JOURNALS_DIR, max_age_days=MAX_AGE_DAYS):
+        self.key = key
+        self.path = os.path.join(directory, f"{key}.jsonl")
+        self.lock = threading.Lock()
+        self._line_start = False  # file known to end with a newline
+        os.makedirs(directory, exist_ok=True)
+        self._prune(directory, max_age_days * 24 * 3600)
+
+    def _prune(self, directory, max_age):
+        cutoff = time.time() - max_age
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if path != self.path and name.endswith(".jsonl") and os.path.getmtime(path) < cutoff:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def load(self):
+        """Journaled results by page index (the last entry of a page wins)."""
+        results = {}
+        if not os.path.exists(self.path):
+            return results
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue
+                results[result["index"]] = result
+        return results
+
+    def append(self, result):
+        """Write one page result and flush it to disk."""
+        line = json.dumps(result, ensure_ascii=False) + "\n"
+        with self.lock:
+            if not self._line_start:
+                # A torn last line from a crash must not swallow the next record
+                if os.path.exists(self.path) and os.path.getsize(self.path):
+                    with open(self.path, "rb") as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            line = "\n" + line
+                self._line_start = True
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def results(self):
+        """Journaled results in page order."""
+        return [result for _, result in sorted(self.load().items())]
+
+    def fields(self):
+        """Extracted fields in page order (rows for utils.excel_writer.save_to_excel)."""
+        for result in self.results():
+            yield result["fields"]
+
+    def remove(self):
+        with self.lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
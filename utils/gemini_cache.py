@@ -0,0 +1,93 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.path.join(".cache", "gemini_cache.sqlite")
+MAX_ENTRIES = 5000
+MAX_AGE_DAYS = 30
+
+
+def cache_key(image_bytes, prompt, model_name):
+    """
+    Content address of one request: sha256 over model name, prompt and image bytes.
+    """
+    digest = hashlib.sha256()
+    for part in (model_name.encode(), prompt.encode(), image_bytes):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Persistent cache of Gemini responses in a local SQLite file.
+    - Entries older than max_age_days are dropped
+    - When there are more than max_entries, the least recently used ones are dropped
+    - hits / misses are counted for this process
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, max_age_days=MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 24 * 3600
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses(used)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key):
+        with self.lock:
+            conn = self._connect()
+            now = time.time()
+            row = conn.execute(
+                "SELECT text FROM responses WHERE key = ? AND created >= ?", (key, now - self.max_age)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, text):
+        with self.lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, text, created, used) VALUES (?, ?, ?, ?)",
+                (key, text, now, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self):
+        with self.lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+# Process-wide cache used by the extractor
+gemini_cache = ExtractionCache()
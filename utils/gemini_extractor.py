@@ -0,0 +1,276 @@
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from google.api_core import exceptions as google_exceptions
+from utils.extract_fields import FIELD_NAMES, clean_fields, extract_fields_from_text, fields_to_text
+from utils.rate_limiter import gemini_limiter
+from utils.gemini_cache import gemini_cache, cache_key
+from utils.perf import NO_PERF
+
+MODEL_NAME = "gemini-2.0-flash"
+
+# How many generate_content calls may be in flight at once
+MAX_CONCURRENT_REQUESTS = 4
+
+# Retry settings for 429 / quota errors
+MAX_RETRIES = 4
+BACKOFF_BASE = 2.0  # seconds, doubled on every retry
+
+# Pages packed into one request in batch mode (1 = one request per page)
+PAGES_PER_REQUEST = 4
+
+PROMPT = (
+    "From this handwritten Urdu police application image, extract ONLY the following fields. "
+    "Translate the content into English if needed and follow fields Example stricly and return Plain Text only\n\n"
+    "Fields Example:\n"
+    """Name: Furqan Ur Rehman (only applicant name)
+    Phone Number: 0313-0282098 (Mention in Last)
+    IMEI Number: 354882089097706 354882089094534
+    last Num Used: 0313-0282044 or None
+    Mobile Model: Motrolla Edge Plus
+    Other Property: None / Cash 3000 / wallet / bike  etc
+    Date Of Offence: 29.06.2025 only use . instead /
+    Time Of Offence: 08:00 PM
+    Type: Snatched / Theft / Lost
+    Police Station: ZamanTown"""
+)
+
+# JSON keys of the structured reply (schema property names stay plain identifiers)
+SCHEMA_KEYS = {name: re.sub(r"\W+", "_", name).strip("_").lower() for name in FIELD_NAMES}
+
+BATCH_PROMPT = (
+    "You get {count} handwritten Urdu police application images, numbered 1 to {count}. "
+    "For every image extract ONLY the fields below, translated into English if needed, "
+    "and return a JSON array with exactly one object per image in the same order "
+    "(\"page\" is the image number). Use an empty string for a field that is missing.\n\n"
+    "Fields Example:\n"
+    """name: Furqan Ur Rehman (only applicant name)
+    phone_number: 0313-0282098
+    imei_number: 354882089097706 354882089094534
+    last_num_used: 0313-0282044 or None
+    mobile_model: Motrolla Edge Plus
+    other_property: None / Cash 3000 / wallet / bike  etc
+    date_of_offence: 29.06.2025 only use . instead /
+    time_of_offence: 08:00 PM
+    type: Snatched / Theft / Lost
+    police_station: ZamanTown"""
+)
+
+# Structured output: an array of records with the same fields as extract_fields_from_text
+BATCH_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"page": {"type": "INTEGER"}, **{key: {"type": "STRING"} for key in SCHEMA_KEYS.values()}},
+        "required": ["page", *SCHEMA_KEYS.values()],
+    },
+}
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    GenerativeModel shared by the whole process. google.generativeai is imported and
+    configured (API key from the gemini_keys environment variable) on the first call only.
+    Safe to share across jobs and event loops because requests only use its blocking
+    client (see _generate); never call generate_content_async on it, its async client
+    stays bound to the first loop that uses it.
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=os.getenv("gemini_keys"))
+            _model = genai.GenerativeModel(MODEL_NAME)
+        return _model
+
+
+async def generate_with_retry(model, image_bytes, mime_type, limiter=gemini_limiter, on_wait=None, perf=None):
+    """
+    One Gemini request behind the shared rate limiter.
+    429 / ResourceExhausted errors are retried with exponential backoff.
+    perf (optional utils.perf.PerfRecorder) gets the rate-limit / backoff
+    sleeps and the request latency as separate spans.
+    """
+    contents = [
+        PROMPT,
+        {
+            "mime_type": mime_type,
+            "data": image_bytes
+        }
+    ]
+    return await _generate(model, contents, None, limiter, on_wait, perf)
+
+
+async def generate_batch(model, images, limiter=gemini_limiter, on_wait=None, perf=None):
+    """
+    One request for several pages: images is a list of (image_bytes, mime_type).
+    Returns the fields of every page in input order.
+    Raises ValueError when the reply does not validate (see parse_batch_reply).
+    """
+    contents = [BATCH_PROMPT.format(count=len(images))]
+    for number, (image_bytes, mime_type) in enumerate(images, start=1):
+        contents += [f"Image {number}:", {"mime_type": mime_type, "data": image_bytes}]
+    generation_config = {"response_mime_type": "application/json", "response_schema": BATCH_SCHEMA}
+    text = await _generate(model, contents, generation_config, limiter, on_wait, perf)
+    return parse_batch_reply(text, len(images))
+
+
+def parse_batch_reply(text, count):
+    """
+    Validate a structured batch reply: a JSON array of `count` records with
+    pages 1..count. Returns the cleaned fields per page, in page order.
+    """
+    try:
+        records = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"Batch reply is not JSON: {e}") from e
+    if not isinstance(records, list) or len(records) != count:
+        raise ValueError(f"Batch reply has {len(records) if isinstance(records, list) else 'no'} records, expected {count}")
+    if not all(isinstance(record, dict) for record in records):
+        raise ValueError("Batch reply records must be objects")
+    if sorted(record.get("page") for record in records if isinstance(record.get("page"), int)) != list(range(1, count + 1)):
+        raise ValueError("Batch reply pages do not match the images")
+
+    records = sorted(records, key=lambda record: record["page"])
+    return [clean_fields({name: record.get(key) for name, key in SCHEMA_KEYS.items()}) for record in records]
+
+
+async def _generate(model, contents, generation_config, limiter, on_wait, perf):
+    perf = perf or NO_PERF
+    for attempt in range(MAX_RETRIES + 1):
+        with perf.span("gemini.rate_limit_wait"):
+            await limiter.acquire(on_wait)
+        try:
+            with perf.span("gemini.request"):
+                # Blocking client in a worker thread: generate_content_async uses a process-wide
+                # gRPC client bound to the first event loop, so later asyncio.run() calls would fail
+                if generation_config:
+                    response = await asyncio.to_thread(model.generate_content, contents, generation_config=generation_config)
+                else:
+                    response = await asyncio.to_thread(model.generate_content, contents)
+            return response.text
+        except google_exceptions.ResourceExhausted:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = BACKOFF_BASE * (2 ** attempt) + random.uniform(0, 1)
+            if on_wait:
+                on_wait(delay)
+            with perf.span("gemini.backoff_wait"):
+                await asyncio.sleep(delay)
+
+
+async def iter_extractions(files, model, concurrency=MAX_CONCURRENT_REQUESTS, on_wait=None, cache=gemini_cache, perf=None,
+                           pages_per_request=1):
+    """
+    Run Gemini extraction for all rasterized files (see utils.pdf_rasterizer.rasterize_files)
+    with up to `concurrency` requests in flight.
+    Pages already in the cache skip both the rate limiter and the request.
+    pages_per_request > 1 packs the remaining pages into batch requests with a
+    JSON schema reply (no text parsing); a batch whose reply does not validate is
+    retried page by page. Batch results are cached under the single-page key.
+    A file's "index" key (position in the whole upload) is kept in its result,
+    otherwise its position in files is used.
+    Yields one result dict per file as soon as it finishes (not in input order):
+    {"index", "file_name", "raw_text", "fields", "cached", "batched"} or {"index", "file_name", "error"}
+    perf (optional utils.perf.PerfRecorder) receives per-stage spans; spans of
+    concurrent requests overlap, so their sum can exceed the wall time.
+    """
+    perf = perf or NO_PERF
+    semaphore = asyncio.Semaphore(concurrency)
+    model_name = getattr(model, "model_name", MODEL_NAME)
+
+    def result(index, file, raw_text, fields, cached, batched=False):
+        return {
+            "index": index,
+            "file_name": file["file_name"],
+            "raw_text": raw_text,
+            "fields": fields,
+            "cached": cached,
+            "batched": batched,
+        }
+
+    def cached_text(file):
+        with perf.span("cache_lookup"):
+            return cache.get(cache_key(file["data"], PROMPT, model_name)) if cache else None
+
+    async def run(index, file, lookup=True):
+        # lookup=False: the page was looked up (and missed) before it was batched
+        queued = time.perf_counter()
+        async with semaphore:
+            perf.add("gemini.queue_wait", time.perf_counter() - queued)
+            try:
+                image_bytes = file["data"]
+                raw_text = cached_text(file) if lookup else None
+                cached = raw_text is not None
+                if not cached:
+                    raw_text = await generate_with_retry(
+                        model, image_bytes, file["mime_type"], on_wait=on_wait, perf=perf
+                    )
+                    if cache:
+                        cache.put(cache_key(image_bytes, PROMPT, model_name), raw_text)
+            except Exception as e:
+                return [{"index": index, "file_name": file["file_name"], "error": str(e)}]
+
+            with perf.span("extract_fields", rows=1):
+                fields = extract_fields_from_text(raw_text)
+            return [result(index, file, raw_text, fields, cached)]
+
+    async def run_batch(batch):
+        queued = time.perf_counter()
+        async with semaphore:
+            perf.add("gemini.queue_wait", time.perf_counter() - queued)
+            try:
+                images = [(file["data"], file["mime_type"]) for _, file in batch]
+                records = await generate_batch(model, images, on_wait=on_wait, perf=perf)
+            except (ValueError, google_exceptions.InvalidArgument):
+                records = None
+            except Exception as e:
+                return [{"index": index, "file_name": file["file_name"], "error": str(e)} for index, file in batch]
+
+        if records is None:
+            # Reply did not validate (or the batch was rejected): one request per page instead
+            perf.add("gemini.batch_fallback", 0.0, rows=len(batch))
+            pages = await asyncio.gather(*(run(index, file, lookup=False) for index, file in batch))
+            return [page for results in pages for page in results]
+
+        results = []
+        for (index, file), fields in zip(batch, records):
+            raw_text = fields_to_text(fields)
+            if cache:
+                cache.put(cache_key(file["data"], PROMPT, model_name), raw_text)
+            results.append(result(index, file, raw_text, fields, cached=False, batched=True))
+        return results
+
+    if pages_per_request > 1:
+        # Cached pages are answered right away, the rest is packed into batches
+        pending = []
+        jobs = []
+        for position, file in enumerate(files):
+            index = file.get("index", position)
+            raw_text = cached_text(file)
+            if raw_text is not None:
+                yield result(index, file, raw_text, extract_fields_from_text(raw_text), cached=True)
+            else:
+                pending.append((index, file))
+        for start in range(0, len(pending), pages_per_request):
+            batch = pending[start:start + pages_per_request]
+            jobs.append(run_batch(batch) if len(batch) > 1 else run(*batch[0], lookup=False))
+    else:
+        jobs = [run(f.get("index", i), f) for i, f in enumerate(files)]
+
+    tasks = [asyncio.create_task(job) for job in jobs]
+    try:
+        for task in asyncio.as_completed(tasks):
+            for item in await task:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,164 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Jobs running at the same time in this server process; the rest wait in the queue.
+# The heavy lifting inside a job already uses process pools (analysis, PDF rendering).
+JOB_WORKERS = 2
+
+# Finished jobs are forgotten after this many seconds
+JOB_TTL = 6 * 3600
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function (by Job.check_cancelled) once the job is cancelled."""
+
+
+class Job:
+    """
+    One background job. The job function receives it as its first argument and reports through it:
+    - update(progress=0..1, message="...")
+    - log(level, text)       level: "info" / "success" / "error" / "warning"
+    - add_item(item)         partial results, e.g. one per page
+    - cancelled / check_cancelled()
+    Readers (the UI) use status, progress, message, events(), items() and result / error.
+    """
+
+    def __init__(self, kind, owner=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.owner = owner
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Waiting for a free worker ..."
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._events = []
+        self._items = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    # -------------------- Called by the job function --------------------
+    def update(self, progress=None, message=None):
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+
+    def log(self, level, text):
+        with self._lock:
+            self._events.append((level, text))
+
+    def add_item(self, item):
+        with self._lock:
+            self._items.append(item)
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    # -------------------- Called by readers --------------------
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def items(self):
+        with self._lock:
+            return list(self._items)
+
+    @property
+    def done(self):
+        return self.status in FINISHED
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobQueue:
+    """
+    Local job queue: a thread pool running job functions in the server process,
+    so a job keeps going when the Streamlit script reruns or the user switches page.
+    Jobs are looked up by ID; cancellation is cooperative (the job checks job.cancelled).
+    """
+
+    def __init__(self, workers=JOB_WORKERS, ttl=JOB_TTL):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.ttl = ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, owner=None, **kwargs):
+        """Queue fn(job, *args, **kwargs) and return the job."""
+        job = Job(kind, owner)
+        with self.lock:
+            self._prune()
+            self.jobs[job.id] = job
+        self.pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            job.status, job.finished = CANCELLED, time.time()
+            return
+        job.status, job.started = RUNNING, time.time()
+        job.message = "Running ..."
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = CANCELLED if job.cancelled else DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.log("error", traceback.format_exc(limit=5))
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            if job.status == CANCELLED:
+                job.message = "Cancelled"
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and not job.done:
+            job._cancel.set()
+            job.message = "Cancelling ..."
+        return job
+
+    def list(self, owner=None):
+        """Jobs (of one owner, e.g. a session), newest first."""
+        with self.lock:
+            jobs = [job for job in self.jobs.values() if owner is None or job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def pending_before(self, job):
+        """How many queued jobs were submitted before this one."""
+        with self.lock:
+            return sum(1 for other in self.jobs.values() if other.status == QUEUED and other.created < job.created)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id, job in list(self.jobs.items()):
+            if job.done and job.finished and job.finished < cutoff:
+                del self.jobs[job_id]
+
+
+# Process-wide queue shared by every Streamlit session (survives reruns)
+job_queue = JobQueue()
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LAYOUTS_PATH = os.path.join(".cache", "layouts.json")
+
+
+def header_fingerprint(values, kind="xlsx"):
+    """
+    Fingerprint of a header row: file kind + stripped, lowercased cell values.
+    The same operator export always gives the same fingerprint.
+    """
+    names = [str(v).strip().lower() for v in values]
+    return hashlib.sha1("\x1f".join([kind, *names]).encode()).hexdigest()[:16]
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on path + ".lock", held across processes (fcntl / msvcrt)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10s
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class LayoutRegistry:
+    """
+    Operator sheet layouts seen before, keyed by header fingerprint:
+    {"header_row", "columns", "roles", "date_format", "hits", "last_seen"}
+    - header_row : index of the header inside the sheet (0 for CSV)
+    - columns    : column names as they appear in the frame
+    - roles      : find_columns() result (a, b, address, imei, date -> column or None)
+    - date_format: strftime format of the date column once it is known
+    Stored as a small JSON file shared by all processes: updates re-read and rewrite
+    it under a file lock, so layouts learned at the same time in pool workers are all kept.
+    """
+
+    def __init__(self, path=LAYOUTS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self._layouts = {}
+        self._mtime = None
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return self._layouts
+        if mtime != self._mtime:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._layouts = json.load(f)
+            except (OSError, ValueError):
+                self._layouts = {}
+            self._mtime = mtime
+        return self._layouts
+
+    def get(self, fingerprint):
+        with self.lock:
+            return self._load().get(fingerprint)
+
+    def header_rows(self, kind="xlsx"):
+        """Header offsets of the known layouts, checked before the keyword scan."""
+        with self.lock:
+            return {layout["header_row"] for layout in self._load().values() if layout.get("kind", "xlsx") == kind}
+
+    def remember(self, fingerprint, hit=True, **fields):
+        """Create or update a layout and save the registry (hit=False: update without counting a use)."""
+        with self.lock, _file_lock(self.path):
+            # Read again under the lock: another process may have saved a moment ago
+            self._mtime = None
+            layouts = dict(self._load())
+            layout = dict(layouts.get(fingerprint, {"hits": 0}))
+            layout.update({k: v for k, v in fields.items() if v is not None})
+            if hit:
+                layout["hits"] += 1
+            layout["last_seen"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            layouts[fingerprint] = layout
+
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(layouts, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._layouts = layouts
+            self._mtime = os.path.getmtime(self.path)
+            return layout
+
+
+# Process-wide registry
+layout_registry = LayoutRegistry()
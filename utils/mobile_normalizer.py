@@ -0,0 +1,53 @@
+try:
+    import pyarrow  # noqa: F401
+    # Arrow strings run the regex ops in C++ instead of a Python loop per cell
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "string"
+
+# Digits only, optional 92 / 0 prefix, then a 10 digit mobile starting with 3
+# (+92 is covered too because the "+" is removed with the other non-digits)
+MOBILE_PATTERN = r"(?:92|0)?3\d{9}"
+
+# Leading space so Excel keeps the number as text
+EXCEL_TEXT_PREFIX = " "
+
+
+def normalize_mobile_series(series, excel_safe=False):
+    """
+    Vectorized mobile number normalization for a whole column:
+    - Accepts 03XXXXXXXXX, 92XXXXXXXXXX, +92XXXXXXXXXX, 3XXXXXXXXX (any separators)
+    - Returns 3XXXXXXXXX or missing if invalid, as a categorical (CDRs repeat
+      the same numbers over and over)
+    - excel_safe=True returns plain strings with the leading space instead
+      (the writers normally add it themselves, see utils.compact_frame.excel_text)
+    """
+    digits = series.astype(STRING_DTYPE).str.replace(r"\D", "", regex=True)
+    valid = digits.str.fullmatch(MOBILE_PATTERN).fillna(False).astype(bool)
+
+    # A valid number always ends with the 10 digit 3XXXXXXXXX part
+    numbers = digits.str.slice(-10).where(valid)
+    if not excel_safe:
+        return numbers.astype("category")
+
+    numbers = EXCEL_TEXT_PREFIX + numbers
+    return numbers.astype(object).where(numbers.notna(), None)
+
+
+def normalize_mobile_columns(df, columns, excel_safe=False):
+    """
+    Normalize the given columns in place and remember them in df.attrs,
+    so later stages (analyze_excel) don't normalize the same column again.
+    Without excel_safe the columns are also listed in df.attrs["excel_text_cols"]
+    (they get the Excel-safe prefix when written).
+    """
+    done = df.attrs.setdefault("normalized_mobile_cols", [])
+    text_cols = df.attrs.setdefault("excel_text_cols", [])
+    for col in columns:
+        if not col or col in done:
+            continue
+        df[col] = normalize_mobile_series(df[col], excel_safe=excel_safe)
+        done.append(col)
+        if not excel_safe and col not in text_cols:
+            text_cols.append(col)
+    return df
@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.Excel_analyzer import analyze_excel
+from utils.case_store import CASE_PARTITION_NAME
+from utils.perf import PerfRecorder
+
+
+def analyze_to_dir(file_path, output_dir, case_partition=False, formatted_data=True, data_format="xlsx"):
+    """
+    Worker: analyze one file into its own output directory
+    (analyze_excel always uses the same output file name).
+    Returns (analyzed_path, rows, spans, data_path) where spans are the per-stage
+    timings (utils.perf.PerfRecorder.to_list()) and data_path the bulk Formatted Data
+    file (None when it is a sheet of the workbook, see analyze_excel data_format).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stats = {}
+    perf = PerfRecorder()
+    with perf.span("analyze_excel") as span:
+        analyzed_path = analyze_excel(
+            file_path, output_dir=output_dir, case_partition=case_partition, stats=stats, perf=perf,
+            formatted_data=formatted_data, data_format=data_format,
+        )
+        span["rows"] = stats["rows"]
+    return analyzed_path, stats["rows"], perf.to_list(), stats.get("data_path")
+
+
+def partition_path(analyzed_path):
+    """Case partition written next to an analyzed workbook (case_partition=True)."""
+    return os.path.join(os.path.dirname(analyzed_path), CASE_PARTITION_NAME)
+
+
+def iter_analyses(file_paths, output_dir, workers=None, case_partition=False, formatted_data=True, data_format="xlsx"):
+    """
+    Run analyze_excel for every file in a process pool.
+    Yields one dict per file as it finishes:
+    {"file_path", "analyzed_path", "rows", "spans", "data_path", "error"}
+    a failing file only produces an error entry, the others keep going.
+    Closing the generator early skips the files not started yet.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(file_paths))
+    jobs = [(path, os.path.join(output_dir, f"analyzed_{i}")) for i, path in enumerate(file_paths)]
+
+    # One file (or one worker): no pool to start
+    if workers <= 1:
+        for path, out_dir in jobs:
+            try:
+                analyzed_path, rows, spans, data_path = analyze_to_dir(
+                    path, out_dir, case_partition, formatted_data, data_format
+                )
+                yield {"file_path": path, "analyzed_path": analyzed_path, "rows": rows, "spans": spans,
+                       "data_path": data_path, "error": None}
+            except Exception as e:
+                yield {"file_path": path, "analyzed_path": None, "rows": 0, "spans": [],
+                       "data_path": None, "error": str(e)}
+        return
+
+    # Spawned, not forked: a fork of the Streamlit process could copy a lock another job thread
+    # holds (layout registry, case store) and hang the worker
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            pool.submit(analyze_to_dir, path, out_dir, case_partition, formatted_data, data_format): path
+            for path, out_dir in jobs
+        }
+        try:
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    analyzed_path, rows, spans, data_path = future.result()
+                    yield {"file_path": path, "analyzed_path": analyzed_path, "rows": rows, "spans": spans,
+                           "data_path": data_path, "error": None}
+                except Exception as e:
+                    yield {"file_path": path, "analyzed_path": None, "rows": 0, "spans": [],
+                           "data_path": None, "error": str(e)}
+        finally:
+            # Generator closed early (e.g. a cancelled job): files not started yet are dropped
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+
+# Rendering / upload settings (72 dpi is the PyMuPDF default)
+RENDER_DPI = 100
+GRAYSCALE = True
+JPEG_QUALITY = 80
+
+# Below this many pages the process pool costs more than it saves
+MIN_PAGES_FOR_POOL = 4
+
+IMAGE_MIME_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+
+
+def _encode(pix, grayscale, jpeg_quality):
+    """
+    Pixmap -> (bytes, mime_type). JPEG when jpeg_quality is set, else PNG.
+    """
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)  # JPEG has no alpha channel
+    if grayscale and pix.n > 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    if jpeg_quality:
+        return pix.tobytes("jpeg", jpg_quality=jpeg_quality), "image/jpeg"
+    return pix.tobytes("png"), "image/png"
+
+
+def render_pdf_pages(path, page_indexes, dpi=RENDER_DPI, grayscale=GRAYSCALE, jpeg_quality=JPEG_QUALITY):
+    """
+    Open the PDF once and render the given pages.
+    Returns a list of (page_index, image_bytes, mime_type).
+    """
+    results = []
+    with fitz.open(path) as doc:
+        for page_index in page_indexes:
+            pix = doc.load_page(page_index).get_pixmap(dpi=dpi)
+            data, mime_type = _encode(pix, grayscale, jpeg_quality)
+            results.append((page_index, data, mime_type))
+    return results
+
+
+def load_image(path, grayscale=GRAYSCALE, jpeg_quality=JPEG_QUALITY):
+    """
+    Image file -> (bytes, mime_type). Re-encoded only when grayscale / JPEG is requested.
+    """
+    if not grayscale and not jpeg_quality:
+        with open(path, "rb") as f:
+            return f.read(), IMAGE_MIME_TYPES[os.path.splitext(path)[1].lower()]
+    return _encode(fitz.Pixmap(path), grayscale, jpeg_quality)
+
+
+def rasterize_files(files, dpi=RENDER_DPI, grayscale=GRAYSCALE, jpeg_quality=JPEG_QUALITY, workers=None):
+    """
+    Add "data" and "mime_type" to every entry from handle_files.
+    PDF pages are split into one contiguous batch per worker; each worker opens
+    its document once and renders its batch in a separate process.
+    Entries that fail get an "error" key instead.
+    """
+    workers = workers or os.cpu_count() or 1
+    pdf_pages = {}
+    for file in files:
+        if "page_index" in file:
+            pdf_pages.setdefault(file["path"], []).append(file["page_index"])
+        else:
+            try:
+                file["data"], file["mime_type"] = load_image(file["path"], grayscale, jpeg_quality)
+            except Exception as e:
+                file["error"] = str(e)
+
+    total_pages = sum(len(pages) for pages in pdf_pages.values())
+    rendered = {}
+    failed = {}
+
+    if total_pages < MIN_PAGES_FOR_POOL or workers == 1:
+        for path, pages in pdf_pages.items():
+            try:
+                for page_index, data, mime_type in render_pdf_pages(path, pages, dpi, grayscale, jpeg_quality):
+                    rendered[(path, page_index)] = (data, mime_type)
+            except Exception as e:
+                failed[path] = str(e)
+    else:
+        # Spawned, not forked: the app process has gRPC / job threads whose locks a fork would copy held
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, total_pages), mp_context=spawn) as pool:
+            futures = {}
+            for path, pages in pdf_pages.items():
+                batch_size = max(1, -(-len(pages) // workers))
+                for start in range(0, len(pages), batch_size):
+                    batch = pages[start:start + batch_size]
+                    futures[pool.submit(render_pdf_pages, path, batch, dpi, grayscale, jpeg_quality)] = path
+            for future, path in futures.items():
+                try:
+                    for page_index, data, mime_type in future.result():
+                        rendered[(path, page_index)] = (data, mime_type)
+                except Exception as e:
+                    failed[path] = str(e)
+
+    for file in files:
+        if "page_index" not in file:
+            continue
+        key = (file["path"], file["page_index"])
+        if key in rendered:
+            file["data"], file["mime_type"] = rendered[key]
+        else:
+            file["error"] = failed.get(file["path"], "Page could not be rendered")
+
+    return files
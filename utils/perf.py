@@ -0,0 +1,209 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Set to an OTLP/HTTP collector (e.g. http://localhost:4318) to also export spans as traces
+OTEL_ENDPOINT_ENV = "OTEL_EXPORTER_OTLP_ENDPOINT"
+TRACER_NAME = "excel_analizer"
+
+_tracing_ready = None
+_tracing_guard = threading.Lock()
+
+
+def peak_rss_mb():
+    """
+    Highest resident memory this process ever reached, in MB (None where resource
+    is unavailable, e.g. Windows). Per stage only in a process of its own.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def rss_mb():
+    """Current resident memory of this process in MB (None without /proc/self/statm, e.g. Windows / macOS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+class PerfRecorder:
+    """
+    Stage-level spans: wall time, rows processed and memory.
+    Memory is sampled at the start and end of every timed block: rss_mb is the
+    highest RSS seen there, rss_delta_mb how much RSS grew during the stage
+    (summed over calls). The process-wide peak is in to_json() only, a long-lived
+    process (Streamlit) would show the same server-wide value for every stage.
+    Spans with the same name are accumulated (chunk loops, one span per Gemini
+    request, ...) and keep their first-seen order.
+    With enabled=False every call is a no-op, so callers never need to check.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.spans = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds, rows=None, started=None, calls=1, rss=None, rss_delta=None):
+        """
+        Record `seconds` spent in stage `name` (started = epoch seconds of the first call).
+        rss / rss_delta: RSS in MB at the end of the stage and its growth during it
+        (None for stages without memory samples, e.g. waits).
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            span = self.spans.setdefault(
+                name, {
+                    "name": name, "calls": 0, "seconds": 0.0, "rows": None,
+                    "rss_mb": None, "rss_delta_mb": None, "started": started or time.time(),
+                }
+            )
+            span["calls"] += calls
+            span["seconds"] += seconds
+            if rows is not None:
+                span["rows"] = (span["rows"] or 0) + rows
+            if rss is not None:
+                span["rss_mb"] = max(span["rss_mb"] or 0, rss)
+            if rss_delta is not None:
+                span["rss_delta_mb"] = round((span["rss_delta_mb"] or 0) + rss_delta, 1)
+
+    def _add_sampled(self, name, seconds, rows, started, rss_start):
+        """add() with the RSS sampled now and at the start of the stage."""
+        rss = rss_mb() if rss_start is not None else None
+        if rss is None:
+            self.add(name, seconds, rows, started)
+        else:
+            self.add(name, seconds, rows, started, rss=max(rss, rss_start), rss_delta=rss - rss_start)
+
+    @contextmanager
+    def span(self, name, rows=None):
+        """
+        Time a block. The yielded dict may be updated with {"rows": n} inside the block.
+        """
+        info = {"rows": rows}
+        rss_start = rss_mb() if self.enabled else None
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self._add_sampled(name, time.perf_counter() - start, info["rows"], started, rss_start)
+
+    def iter(self, name, iterable):
+        """Yield from iterable, timing every next() as stage `name` (rows = len(item))."""
+        iterator = iter(iterable)
+        while True:
+            rss_start = rss_mb() if self.enabled else None
+            started = time.time()
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            rows = len(item) if hasattr(item, "__len__") else None
+            self._add_sampled(name, time.perf_counter() - start, rows, started, rss_start)
+            yield item
+
+    def merge(self, spans, prefix=""):
+        """Add spans recorded elsewhere (e.g. in a worker process, see to_list())."""
+        for span in spans:
+            self.add(
+                prefix + span["name"], span["seconds"], span["rows"], span["started"], span["calls"],
+                span.get("rss_mb"), span.get("rss_delta_mb"),
+            )
+
+    def to_list(self):
+        with self.lock:
+            return [dict(span) for span in self.spans.values()]
+
+    def to_json(self, path=None):
+        """Spans as JSON text, also written to `path` when given."""
+        text = json.dumps({"peak_rss_mb": peak_rss_mb(), "spans": self.to_list()}, indent=2)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def export_otel(self, root_name="pipeline"):
+        """
+        Send the spans as one OpenTelemetry trace (children of `root_name`).
+        Returns False when tracing is not configured (see setup_tracing).
+        """
+        if not self.enabled or not setup_tracing():
+            return False
+        from opentelemetry import trace
+
+        tracer = trace.get_tracer(TRACER_NAME)
+        spans = self.to_list()
+        if not spans:
+            return True
+        to_ns = lambda seconds: int(seconds * 1e9)
+        start = min(span["started"] for span in spans)
+        end = max(span["started"] + span["seconds"] for span in spans)
+
+        root = tracer.start_span(root_name, start_time=to_ns(start))
+        context = trace.set_span_in_context(root)
+        for span in spans:
+            child = tracer.start_span(span["name"], context=context, start_time=to_ns(span["started"]))
+            child.set_attribute("calls", span["calls"])
+            child.set_attribute("seconds", span["seconds"])
+            if span["rows"] is not None:
+                child.set_attribute("rows", span["rows"])
+            for key in ("rss_mb", "rss_delta_mb"):
+                if span[key] is not None:
+                    child.set_attribute(key, span[key])
+            child.end(end_time=to_ns(span["started"] + span["seconds"]))
+        root.end(end_time=to_ns(end))
+        return True
+
+
+# Shared do-nothing recorder for callers that did not ask for spans
+NO_PERF = PerfRecorder(enabled=False)
+
+
+def setup_tracing():
+    """
+    Configure OpenTelemetry once per process when OTEL_EXPORTER_OTLP_ENDPOINT is set:
+    an OTLP/HTTP span exporter plus the google-generativeai instrumentation,
+    so every Gemini request also shows up as a span.
+    Returns False when the endpoint is unset or the packages are missing.
+    """
+    global _tracing_ready
+    with _tracing_guard:
+        if _tracing_ready is not None:
+            return _tracing_ready
+        _tracing_ready = False
+        if not os.getenv(OTEL_ENDPOINT_ENV):
+            return False
+        try:
+            from opentelemetry import trace
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            return False
+
+        provider = TracerProvider(resource=Resource.create({"service.name": TRACER_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+
+        try:
+            from opentelemetry.instrumentation.google_generativeai import GoogleGenerativeAiInstrumentor
+            GoogleGenerativeAiInstrumentor().instrument()
+        except ImportError:
+            pass
+
+        _tracing_ready = True
+        return True
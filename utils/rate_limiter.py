@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+# Gemini free tier quota: 10 requests per minute
+REQUEST_LIMIT = 10
+TIME_WINDOW = 60  # seconds
+
+
+class SlidingWindowLimiter:
+    """
+    Rate limiter that keeps every rolling `period` window at or under `limit` requests.
+    - Hands out send times ("slots"): a request may go out at least `period` seconds
+      after the request `limit` places before it
+    - Slots can lie in the future, which queues callers in arrival order
+    - State is guarded by a thread lock, so one limiter can be shared by every
+      Streamlit session / rerun and by every asyncio event loop in the process
+    """
+
+    def __init__(self, limit=REQUEST_LIMIT, period=TIME_WINDOW):
+        self.limit = limit
+        self.period = period
+        self.slots = deque(maxlen=limit)  # send times of the last `limit` requests
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take the next free slot and return how many seconds the caller must wait before using it.
+        """
+        with self.lock:
+            now = time.monotonic()
+            slot = now
+            if len(self.slots) == self.limit:
+                slot = max(now, self.slots[0] + self.period)
+            self.slots.append(slot)
+            return slot - now
+
+    async def acquire(self, on_wait=None):
+        """
+        Wait (without blocking the event loop) until a request may be sent.
+        on_wait(seconds) is called when the caller has to wait for quota.
+        """
+        wait_time = self.reserve()
+        if wait_time > 0:
+            if on_wait:
+                on_wait(wait_time)
+            await asyncio.sleep(wait_time)
+        return wait_time
+
+
+# Process-wide limiter for all Gemini requests (survives Streamlit reruns)
+gemini_limiter = SlidingWindowLimiter()
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+
+RESULTS_DIR = os.path.join(".cache", "results")
+MAX_CACHE_BYTES = 512 * 1024 * 1024  # 512 MB of cached results on disk
+
+
+def upload_key(kind, files):
+    """
+    Content hash of one or more uploads (name + bytes), prefixed with the job kind.
+    files: list of (name, bytes)
+    """
+    digest = hashlib.sha256(kind.encode())
+    for name, data in files:
+        for part in (name.encode(), data):
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+    return f"{kind}-{digest.hexdigest()}"
+
+
+class ResultCache:
+    """
+    Results memoized on disk by upload content hash.
+    Files are evicted least recently used first once the directory
+    grows over max_bytes. Nothing is kept in memory.
+    """
+
+    def __init__(self, directory=RESULTS_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, key + ext)
+
+    def get_path(self, key, ext=".xlsx"):
+        """Path of the cached file, or None."""
+        path = self._path(key, ext)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # mark as recently used
+        return path
+
+    def put_file(self, key, src_path, ext=".xlsx"):
+        """Copy a result file into the cache and return its cached path."""
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key, ext)
+            shutil.copyfile(src_path, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            self._evict()
+        return path
+
+    def get_json(self, key):
+        path = self.get_path(key, ".json")
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def put_json(self, key, data):
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key, ".json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+            self._evict()
+
+    def _evict(self):
+        entries = [e for e in os.scandir(self.directory) if e.is_file() and not e.name.endswith(".tmp")]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class SessionWorkdir:
+    """
+    Private temp directory for one Streamlit session.
+    It is removed when the object is garbage collected (session closed)
+    or when the process exits.
+    """
+
+    def __init__(self, prefix="excel_analyzer_"):
+        self.path = tempfile.mkdtemp(prefix=prefix)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+
+    def file(self, name):
+        """Path for a file inside the work directory (name is reduced to its basename)."""
+        return os.path.join(self.path, os.path.basename(name))
+
+    def cleanup(self):
+        self._finalizer()
+
+
+# Process-wide result cache shared by all sessions
+result_cache = ResultCache()
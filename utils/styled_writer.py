@@ -0,0 +1,175 @@
+import datetime
+import itertools
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from utils.compact_frame import excel_text
+from utils.mobile_normalizer import STRING_DTYPE
+
+HEADER_COLOR = "#ADD8E6"
+
+# Sheets where numeric cells get the "@" (text) number format
+TEXT_NUMBER_SHEETS = ["Mobile Numbers", "IMEI Numbers"]
+
+# Rows per worksheet (header included); longer sheets continue in "<name> (2)", "<name> (3)" ...
+EXCEL_MAX_ROWS = 1_048_576
+MAX_SHEET_NAME = 31
+
+
+def part_name(sheet_name, part):
+    """Worksheet name of part 2, 3 ... of a sheet (cut to Excel's 31 characters)."""
+    suffix = f" ({part})"
+    return sheet_name[:MAX_SHEET_NAME - len(suffix)] + suffix
+
+
+def column_width(name, series):
+    """
+    Max text length of one column (header included), computed column-wise
+    instead of cell by cell. Empty / falsy cells are ignored like before.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Every category of a compact frame occurs in it, so the categories are enough
+        series = pd.Series(series.cat.categories)
+    series = series[series.notna()]
+    if series.dtype == object or pd.api.types.is_numeric_dtype(series):
+        series = series[series.astype(bool)]
+    text = series.astype(str)
+    if pd.api.types.is_float_dtype(series):
+        # Whole floats are stored as integers in the xlsx (3.0 -> 3)
+        text = text.str.removesuffix(".0")
+    lengths = text.str.len()
+    return max(len(str(name)), int(lengths.max()) if len(lengths) else 0)
+
+
+def column_widths(df):
+    """Per-column max text length, see column_width."""
+    return [column_width(col, df.iloc[:, i]) for i, col in enumerate(df.columns)]
+
+
+class StyledExcelWriter:
+    """
+    Constant-memory xlsx writer (xlsxwriter constant_memory mode).
+    Rows are styled while they are written, so there is no load_workbook
+    reformat pass afterwards:
+    - Header: light blue fill, bold, thin border
+    - All cells: centered + wrap text
+    - Numbers in Mobile / IMEI sheets: text format "@"
+    - Column width: longest value + 4
+    Sheets are created up front (in output order) and can be filled in any order,
+    each sheet may receive several frames (chunks) one after another.
+    A sheet that reaches max_rows continues in a new part "<name> (2)" with the same header,
+    placed right after the sheet's earlier parts.
+    """
+
+    def __init__(self, path, sheet_names, max_rows=EXCEL_MAX_ROWS):
+        self.path = path
+        self.book = xlsxwriter.Workbook(path, {
+            "constant_memory": True,
+            "strings_to_urls": False,
+            "strings_to_formulas": False,
+        })
+
+        base = {"align": "center", "valign": "vcenter", "text_wrap": True}
+        self.formats = {
+            "header": self.book.add_format({**base, "bold": True, "border": 1, "bg_color": HEADER_COLOR, "pattern": 1}),
+            "cell": self.book.add_format(base),
+            "text_number": self.book.add_format({**base, "num_format": "@"}),
+            "datetime": self.book.add_format({**base, "num_format": "YYYY-MM-DD HH:MM:SS"}),
+            "date": self.book.add_format({**base, "num_format": "YYYY-MM-DD"}),
+        }
+
+        self.max_rows = max_rows
+        # Worksheets by name (parts included), parts of every sheet in order
+        self.sheets = {name: self.book.add_worksheet(name) for name in sheet_names}
+        self.parts = {name: [name] for name in sheet_names}
+        self.next_row = {name: 0 for name in sheet_names}
+        self.widths = {name: [] for name in sheet_names}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write_value(self, ws, row, col, value, number_format):
+        fmt = self.formats["cell"]
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            ws.write_blank(row, col, None, fmt)
+        elif isinstance(value, str):
+            ws.write_string(row, col, value, fmt)
+        elif isinstance(value, (bool, np.bool_)):
+            ws.write_boolean(row, col, bool(value), number_format)
+        elif isinstance(value, (int, float, np.integer, np.floating)):
+            ws.write_number(row, col, value, number_format)
+        elif isinstance(value, datetime.datetime):
+            ws.write_datetime(row, col, pd.Timestamp(value).to_pydatetime(), self.formats["datetime"])
+        elif isinstance(value, datetime.date):
+            ws.write_datetime(row, col, value, self.formats["date"])
+        else:
+            ws.write_string(row, col, str(value), fmt)
+
+    def _add_part(self, sheet_name):
+        name = part_name(sheet_name, len(self.parts[sheet_name]) + 1)
+        self.sheets[name] = self.book.add_worksheet(name)
+        self.parts[sheet_name].append(name)
+        self.next_row[name] = 0
+        return name
+
+    def write_frame(self, sheet_name, df, text_cols=()):
+        """
+        Append df to the sheet. The header is written with the first frame only
+        (and at the top of every further part of the sheet).
+        Columns in text_cols get the Excel-safe leading space while they are written
+        (the frame itself is not changed).
+        """
+        columns = []
+        for i, name in enumerate(df.columns):
+            series = df.iloc[:, i]
+            if name in text_cols:
+                series = excel_text(series)
+            elif series.dtype == STRING_DTYPE:
+                series = series.astype(object)
+            columns.append(series)
+
+        number_format = self.formats["text_number" if sheet_name in TEXT_NUMBER_SHEETS else "cell"]
+        rows = zip(*columns)
+        remaining = len(df)
+        part = self.parts[sheet_name][-1]
+        while True:
+            ws = self.sheets[part]
+            row = self.next_row[part]
+            if row == 0:
+                for col, name in enumerate(df.columns):
+                    ws.write_string(0, col, str(name), self.formats["header"])
+                row = 1
+
+            count = min(remaining, self.max_rows - row)
+            for values in itertools.islice(rows, count):
+                for col, value in enumerate(values):
+                    self._write_value(ws, row, col, value, number_format)
+                row += 1
+            self.next_row[part] = row
+            remaining -= count
+            if not remaining:
+                break
+            part = self._add_part(sheet_name)
+
+        # Keep the running max width per column (shared by all parts of the sheet)
+        widths = [column_width(name, series) for name, series in zip(df.columns, columns)]
+        old = self.widths[sheet_name]
+        self.widths[sheet_name] = [max(w, old[i]) if i < len(old) else w for i, w in enumerate(widths)]
+
+    def close(self):
+        for sheet_name, parts in self.parts.items():
+            for name in parts:
+                for col, width in enumerate(self.widths[sheet_name]):
+                    # Width in characters of 7px, same as openpyxl column_dimensions.width
+                    self.sheets[name].set_column_pixels(col, col, (width + 4) * 7)
+
+        # Parts are added at the end of the workbook while writing: move each one
+        # next to its sheet ("Mobile Numbers (2)" before "Formatted Data")
+        order = [self.sheets[name] for parts in self.parts.values() for name in parts]
+        self.book.worksheets_objs[:] = order
+        for index, ws in enumerate(order):
+            ws.index = index
+        self.book.close()
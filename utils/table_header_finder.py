@@ -1,61 +1,168 @@
 import pandas as pd
-import re
+import numpy as np
+from openpyxl import load_workbook
+from pandas.io.parsers import TextParser
+from utils.mobile_normalizer import normalize_mobile_columns
+from utils.perf import NO_PERF
+from utils.compact_frame import compact_frame, excel_text_columns
+from utils.layout_registry import header_fingerprint, layout_registry
 
-def read_excel_auto(file_path):
+# How many rows at the top of the sheet are searched for the table header
+HEADER_SCAN_ROWS = 100
+
+known_keywords = ['call', 'type', 'msisdn', 'bnumber', 'a number', 'imei', 'start', 'end']
+
+
+def _convert_cell(cell):
     """
-    Automatically detects where the table starts,
-    cleans headers, and formats numeric columns safely.
+    Convert an openpyxl cell the same way pandas.read_excel does,
+    so the streamed frame matches the old double read exactly.
+    """
+    if cell.value is None:
+        return ""
+    if cell.data_type == "e":
+        return np.nan
+    if cell.data_type == "n":
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+
+def is_header_row(row):
+    """
+    A row is the header when it has more than 2 filled cells
+    and at least one of them contains a known keyword.
+    """
+    values = [str(v).lower() for v in row if v != "" and pd.notna(v)]
+    return len(values) > 2 and any(any(k in v for k in known_keywords) for v in values)
+
+
+def role_indexes(layout):
+    """Sheet positions of the columns a known layout maps to a role (A/B, address, IMEI, date)."""
+    names = {name for name in layout.get("roles", {}).values() if name}
+    return [i for i, name in enumerate(layout["columns"]) if name in names]
+
+
+def read_sheet_rows(file_path, header_scan_rows=HEADER_SCAN_ROWS, registry=None, roles_only=False):
     """
-    # Step 1: Read full sheet without header
-    df_raw = pd.read_excel(file_path, header=None)
+    Stream the first sheet once in read-only mode.
+    Returns (rows, header_row, fingerprint, layout) where rows are the trimmed
+    cell values (same layout pandas builds internally), header_row is the
+    index of the detected header inside rows, fingerprint identifies the
+    header and layout is the registry entry when the layout is known.
+    - Known layouts (utils.layout_registry) are matched at their remembered
+      header offset before the keyword scan
+    - roles_only=True with a known layout keeps only the role columns
+      (rows above the header are dropped, header_row is then 0)
+    """
+    known_rows = registry.header_rows() if registry else set()
+
+    wb = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
 
-    # Step 2: Find the header row automatically
-    header_row = None
-    known_keywords = ['call', 'type', 'msisdn', 'bnumber', 'a number', 'imei', 'start', 'end']
-    for i, row in df_raw.iterrows():
-        values = [str(v).lower() for v in row if pd.notna(v)]
-        if len(values) > 2 and any(any(k in v for k in known_keywords) for v in values):
-            header_row = i
-            break
+        rows = []
+        header_row = None
+        fingerprint = None
+        layout = None
+        keep = None  # column positions kept by a roles_only read
+        last_row_with_data = -1
+        for row_number, row in enumerate(ws.rows):
+            if keep is not None:
+                values = [_convert_cell(row[i]) if i < len(row) else "" for i in keep]
+            else:
+                values = [_convert_cell(cell) for cell in row]
+            while values and values[-1] == "":
+                values.pop()
+            if values:
+                last_row_with_data = len(rows)
+            rows.append(values)
+
+            # Header is only searched in the first N rows
+            if header_row is None:
+                if row_number in known_rows:
+                    layout = registry.get(header_fingerprint(values))
+                    if layout is not None and layout["header_row"] != row_number:
+                        layout = None
+                if layout is not None or is_header_row(values):
+                    header_row = len(rows) - 1
+                    fingerprint = header_fingerprint(values)
+                    if layout is not None and roles_only and layout.get("roles"):
+                        keep = role_indexes(layout)
+                        rows = [[values[i] if i < len(values) else "" for i in keep]]
+                        header_row = last_row_with_data = 0
+                elif row_number + 1 >= header_scan_rows:
+                    break
+    finally:
+        wb.close()
 
     if header_row is None:
         raise ValueError("Table header not found automatically!")
 
-    # Step 3: Re-read with correct header
-    df = pd.read_excel(file_path, header=header_row)
+    # Trim trailing empty rows and pad all rows to the same width
+    rows = rows[: last_row_with_data + 1]
+    max_width = max(len(r) for r in rows)
+    rows = [r + [""] * (max_width - len(r)) for r in rows]
+
+    return rows, header_row, fingerprint, layout
+
+
+def read_excel_auto(file_path, perf=None, registry=layout_registry, roles_only=False):
+    """
+    Automatically detects where the table starts,
+    cleans headers, and marks numeric columns as Excel text.
+    Text columns are kept as categoricals / Arrow strings; the Excel-safe
+    leading space is not part of the values, the columns that need it are
+    listed in df.attrs["excel_text_cols"] (see utils.compact_frame.excel_safe_frame).
+    perf (optional utils.perf.PerfRecorder) receives one span per step.
+    registry: known operator layouts skip the header scan; with
+    roles_only=True they are also read column-selectively (role columns only).
+    The frame's attrs carry "layout_fingerprint", "header_row" and "layout"
+    (the registry entry, or None for a new layout).
+    """
+    perf = perf or NO_PERF
+
+    # Step 1 + 2: Stream the sheet once and find the header row in the first rows
+    with perf.span("read_excel_auto.load_rows") as span:
+        rows, header_row, fingerprint, layout = read_sheet_rows(
+            file_path, registry=registry, roles_only=roles_only
+        )
+        span["rows"] = len(rows) - header_row - 1
+
+    # Step 3: Build the frame from the same rows (no second read)
+    with perf.span("read_excel_auto.parse", rows=len(rows) - header_row - 1):
+        df = TextParser(rows, header=header_row, skip_blank_lines=False).read()
+        del rows
 
     # Step 4: Clean column names
     df.columns = df.columns.astype(str).str.strip().str.lower()
+    df.attrs["layout_fingerprint"] = fingerprint
+    df.attrs["header_row"] = layout["header_row"] if layout else header_row
+    df.attrs["layout"] = layout
 
     # Step 5: Detect A/B number columns
     a_col = next((c for c in df.columns if "a number" in c), None)
     b_col = next((c for c in df.columns if "b number" in c or "bnumber" in c), None)
 
-    # Step 6: Normalize mobile numbers
-    def normalize_mobile(num):
-        if pd.isna(num): return None
-        num = re.sub(r"\D", "", str(num))
-        if num.startswith("+92"): num = num[3:]
-        elif num.startswith("92"): num = num[2:]
-        elif num.startswith("0"): num = num[1:]
-        if re.fullmatch(r"3\d{9}", num):
-            return " " + num  # add space for Excel safety
-        return None
-
-    if a_col: df[a_col] = df[a_col].apply(normalize_mobile)
-    if b_col: df[b_col] = df[b_col].apply(normalize_mobile)
-
-    # Step 7: Add space to long numeric values (IMEI etc.)
-    for col in df.columns:
-        try:
-            values = df[col].dropna().astype(str)
-            if values.str.match(r"^\d+$").mean() > 0.8:
-                df[col] = df[col].apply(lambda x: f" {x}" if pd.notna(x) else x)
-        except:
-            pass
+    # Step 6: Normalize mobile numbers (once, vectorized)
+    with perf.span("read_excel_auto.normalize", rows=len(df)):
+        normalize_mobile_columns(df, [a_col, b_col])
+
+    # Step 7: Compact dtypes (categorical / Arrow strings instead of Python str objects)
+    with perf.span("read_excel_auto.compact", rows=len(df)):
+        compact_frame(df)
+
+    # Step 8: One typing pass marks number columns (IMEI, IDs, numeric only) as Excel text
+    # columns; the leading space is only added when the frame is written
+    with perf.span("read_excel_auto.text_columns", rows=len(df)):
+        text_cols = df.attrs["excel_text_cols"]
+        text_cols += excel_text_columns(df, skip=text_cols)
 
     return df
 
 # Example:
 # df = read_excel_auto("call_data.xlsx")
-# df.to_excel("cleaned_output.xlsx", index=False)
+# excel_safe_frame(df).to_excel("cleaned_output.xlsx", index=False)